@@ -0,0 +1,240 @@
+import math
+import os
+import numpy as np
+import planets
+
+
+class Table(object):
+    ''' Evenly spaced atmosphere table served by linear interpolation.
+    Temperature in Celsius, pressure in kPa and density in kg/m3. '''
+
+    def __init__(self, altitudes, temperature, pressure, density, fallback):
+        self.altitudes = np.asarray(altitudes, dtype=float)
+        self.temperature = np.asarray(temperature, dtype=float)
+        self.pressure = np.asarray(pressure, dtype=float)
+        self.density = np.asarray(density, dtype=float)
+        self.bottom = float(self.altitudes[0])
+        self.ceiling = float(self.altitudes[-1])
+        self.spacing = float(self.altitudes[1] - self.altitudes[0])
+        self.scale = 1 / self.spacing
+        self.fallback = fallback    # Model used outside of the table
+        # Values and slopes per row, the last row repeats so indexing never overruns
+        self.values = np.stack([self.temperature, self.pressure, self.density], axis=1)
+        self.slopes = np.diff(self.values, axis=0, append=self.values[-1:])
+        # Python lists index faster than arrays in the scalar path
+        self.rows = [tuple(v) + tuple(s) for v, s in zip(self.values.tolist(), self.slopes.tolist())]
+
+    def conditions(self, altitude):
+        ''' Returns temperature, pressure and density at a single altitude. '''
+        if altitude < self.bottom or altitude >= self.ceiling:
+            return self.fallback(altitude)
+        x = (altitude - self.bottom) * self.scale
+        i = int(x)
+        f = x - i
+        t, p, d, dt, dp, dd = self.rows[i]
+        return t + f * dt, p + f * dp, d + f * dd
+
+    def lookup(self, altitudes):
+        ''' Returns temperature, pressure and density arrays for an array of altitudes. '''
+        altitudes = np.asarray(altitudes, dtype=float)
+        x = (altitudes - self.bottom) * self.scale
+        i = np.clip(x, 0, len(self.values) - 1).astype(np.intp)
+        f = (x - i)[:, np.newaxis]
+        temperature, pressure, density = (self.values[i] + f * self.slopes[i]).T
+        outside = (altitudes < self.bottom) | (altitudes >= self.ceiling)
+        if outside.any():
+            temperature[outside], pressure[outside], density[outside] = self.fallback(altitudes[outside])
+        return temperature, pressure, density
+
+
+def nasa(altitude):
+    # NASA atmospheric model | https://www.grc.nasa.gov/www/k-12/rocket/atmosmet.html
+    if altitude < 11000:
+        temperature = 15.04 - .00649 * altitude    # Celsius
+        pressure = 101.29 * ((temperature + 273.1) / 288.08) ** 5.256    # kPa
+    elif altitude < 25000:
+        temperature = -56.46
+        pressure = 22.65 * math.exp(1.73 - 0.000157 * altitude)
+    else:
+        temperature = -131.21 + .00299 * altitude
+        pressure = 2.488 * ((temperature + 273.1) / 216.6) ** -11.388
+    return temperature, pressure, pressure / (0.2869 * (temperature + 273.1))
+
+
+def nasa_array(altitudes):
+    # Vectorized form of nasa()
+    altitudes = np.asarray(altitudes, dtype=float)
+    low = altitudes < 11000
+    middle = (altitudes >= 11000) & (altitudes < 25000)
+    with np.errstate(invalid='ignore', over='ignore'):
+        temperature = np.where(low, 15.04 - .00649 * altitudes,
+                               np.where(middle, -56.46, -131.21 + .00299 * altitudes))
+        pressure = np.where(low, 101.29 * ((temperature + 273.1) / 288.08) ** 5.256,
+                            np.where(middle, 22.65 * np.exp(1.73 - 0.000157 * altitudes),
+                                     2.488 * ((temperature + 273.1) / 216.6) ** -11.388))
+    return temperature, pressure, pressure / (0.2869 * (temperature + 273.1))
+
+
+def nasa_fallback(altitude):
+    if np.ndim(altitude):
+        return nasa_array(altitude)
+    return nasa(altitude)
+
+
+def nasa_table(resolution=10, ceiling=150000):
+    altitudes = np.arange(0, ceiling + resolution, resolution, dtype=float)
+    return Table(altitudes, *nasa_array(altitudes), fallback=nasa_fallback)
+
+
+def standard_table(path=None, resolution=10):
+    # US Standard Atmosphere table | altitude (m), temperature (K), pressure (Pa), density (kg/m3)
+    data = np.loadtxt(path or standard_atmosphere_csv)
+    altitudes = np.arange(data[0, 0], data[-1, 0] + resolution, resolution, dtype=float)
+    # Pressure and density fall exponentially, so they are interpolated in log space
+    temperature = np.interp(altitudes, data[:, 0], data[:, 1]) - 273.15
+    pressure = np.exp(np.interp(altitudes, data[:, 0], np.log(data[:, 2]))) / 1000
+    density = np.exp(np.interp(altitudes, data[:, 0], np.log(data[:, 3])))
+    return Table(altitudes, temperature, pressure, density, fallback=nasa_fallback)
+
+
+def thermosphere(lower, exospheric_temperature=1000, ceiling=2500000, resolution=250):
+    ''' Table continuing the lower table from its top up to ceiling, the upper
+    part of Standard and Bates. Temperature falls to the mesopause, holds to
+    91 km and rises to 120 km as in the US Standard Atmosphere 1976, then follows
+    a Bates (1959) profile toward the exospheric temperature in Kelvin. Density
+    is integrated hydrostatically from the lower table's top with a mean
+    molecular mass that falls with altitude as the atmosphere separates by
+    diffusion, so the two join without a step. Below the table the lower one is
+    used, above it the air is a vacuum. '''
+    base = lower.ceiling
+    altitudes = np.arange(base, ceiling + resolution, resolution, dtype=float)
+    km = altitudes / 1000
+    bates = exospheric_temperature - (exospheric_temperature - 360.0) * np.exp(
+        -0.01875 * (km - 120) * (Earth.radius / 1000 + 120) / (Earth.radius / 1000 + km))
+    mesosphere = np.interp(km, [base / 1000, 86, 91, 100, 110, 120],
+                           [lower.temperature[-1] + 273.15, 186.87, 186.87, 195.08, 240.0, 360.0])
+    temperature = np.where(km < 120, mesosphere, bates)
+    molar_mass = np.interp(km, molar_mass_altitudes, molar_masses) / 1000    # kg/mol
+    g = 9.805 * (Earth.radius / (Earth.radius + altitudes)) ** 2
+    # Hydrostatic equilibrium, d(ln p)/dz = -M g / (R T), integrated with the trapezoid rule
+    scale = molar_mass * g / (gas_constant * temperature)
+    log_pressure = np.concatenate([[0.0], np.cumsum((scale[1:] + scale[:-1]) / 2 * np.diff(altitudes))])
+    # Anchored on the lower table's density, the CSV's pressure column is rounded to whole pascals up there
+    pressure = lower.density[-1] * gas_constant * temperature[0] / molar_mass[0] * np.exp(-log_pressure)
+    density = pressure * molar_mass / (gas_constant * temperature)
+    vacuum = exospheric_temperature - 273.15, 0.0, 0.0
+
+    def fallback(altitude):
+        if np.ndim(altitude):
+            temperature = np.full(len(altitude), vacuum[0])
+            pressure, density = np.zeros(len(altitude)), np.zeros(len(altitude))
+            below = altitude < base
+            if below.any():
+                temperature[below], pressure[below], density[below] = lower.lookup(altitude[below])
+            return temperature, pressure, density
+        if altitude < base:
+            return lower.conditions(altitude)
+        return vacuum
+    return Table(altitudes, temperature - 273.15, pressure / 1000, density, fallback=fallback)
+
+
+class Atmosphere(object):
+    ''' Atmosphere model served from a table built once per process.
+    Subclasses implement build() and may raise drag_ceiling. '''
+    drag_ceiling = 80000    # Drag is ignored above this altitude, meters
+
+    def __init__(self):
+        self.table = self.build()
+        # Bound directly so the per-step call skips a layer of indirection
+        self.conditions = self.table.conditions
+        self.lookup = self.table.lookup
+
+    def density(self, altitudes):
+        ''' Air density in kg/m3 for an array of altitudes. '''
+        return self.lookup(altitudes)[2]
+
+
+class NASA(Atmosphere):
+    ''' NASA Glenn Research Center model, see nasa(). The formulas are faster
+    than interpolating the table, for a single altitude in Python and for
+    arrays of a few dozen altitudes and more, so both are served by them. The
+    table is kept for scans of the density profile. '''
+
+    def __init__(self):
+        Atmosphere.__init__(self)
+        self.conditions = nasa
+        self.lookup = nasa_array
+
+    def build(self):
+        return nasa_table()
+
+
+class Standard(Atmosphere):
+    ''' US Standard Atmosphere 1976, the CSV table up to 80 km continued by
+    thermosphere() with the standard's exospheric temperature up to its top. '''
+    exospheric_temperature = 1000    # Kelvin
+    ceiling = 1000000    # meters
+
+    def build(self):
+        table = standard_table()
+        self.upper = thermosphere(table, self.exospheric_temperature, self.ceiling)
+        table.fallback = self.fallback
+        return table
+
+    def fallback(self, altitude):
+        # NASA model below the table, the thermosphere above it
+        top = self.upper.bottom
+        if np.ndim(altitude):
+            temperature, pressure, density = nasa_array(altitude)
+            above = altitude >= top
+            if above.any():
+                temperature[above], pressure[above], density[above] = self.upper.lookup(altitude[above])
+            return temperature, pressure, density
+        if altitude >= top:
+            return self.upper.conditions(altitude)
+        return nasa(altitude)
+
+
+class Bates(Atmosphere):
+    ''' US Standard Atmosphere table with a thermosphere of selectable exospheric
+    temperature above 80 km, up to 2500 km, with drag at every altitude. This is
+    an approximation in the spirit of Jacchia's models, not the Jacchia-Lineberry
+    fit: a Bates temperature profile, hydrostatic density and a tabulated mean
+    molecular mass in place of per-species diffusive equilibrium, see
+    thermosphere(). At 1000 K it matches Standard up to 1000 km. '''
+    drag_ceiling = float('inf')
+    ceiling = 2500000    # meters
+
+    def __init__(self, exospheric_temperature=1000):
+        # Kelvin, ~700 at solar minimum, ~1400 at maximum
+        self.exospheric_temperature = exospheric_temperature
+        self.lower = get('standard')
+        Atmosphere.__init__(self)
+
+    def build(self):
+        # Starts from the last row of the standard table, ~80 km
+        return thermosphere(self.lower.table, self.exospheric_temperature, self.ceiling)
+
+
+def get(model='nasa'):
+    ''' Returns a shared atmosphere instance for a model name, built once per process.
+    Atmosphere instances are returned unchanged. '''
+    if isinstance(model, Atmosphere):
+        return model
+    if model not in models:
+        if model not in backends:
+            raise ValueError('Unknown atmosphere model: ' + str(model))
+        models[model] = backends[model]()
+    return models[model]
+
+
+Earth = planets.Earth()    # Planet reference information
+gas_constant = 8.314462618    # J/(mol K)
+# Mean molecular mass of air (g/mol) with altitude (km), US Standard Atmosphere 1976
+molar_mass_altitudes = [90, 100, 120, 150, 200, 300, 400, 500, 600, 700, 800, 1000, 2500]
+molar_masses = [28.96, 28.4, 26.2, 24.1, 21.3, 17.7, 15.98, 14.33, 11.5, 8.6, 6.6, 3.94, 1.5]
+
+standard_atmosphere_csv = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                       '-bak', 'US_standard_atmosphere.csv')
+backends = {'nasa': NASA, 'standard': Standard, 'bates': Bates}
+models = {}    # Shared instances, keyed by model name
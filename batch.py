@@ -0,0 +1,198 @@
+import numpy as np
+import pandas as pd
+import gravity
+import rocket
+import planets
+
+
+class Batch(object):
+    ''' Advances many single stage rockets together. Use metric units. '''
+
+    def __init__(self, rockets, record=False):
+        if len(set(r.step for r in rockets)) > 1:
+            raise ValueError('All rockets in a batch must use the same time step')
+        if any(r.engine.nozzle is not None or r.engine.throttle is not None for r in rockets):
+            raise ValueError('Batches fly constant exhaust velocity engines only')
+        if any(r.guidance is not None for r in rockets):
+            raise ValueError('Batches fly fixed angles only')
+        self.size = len(rockets)
+        self.step = rockets[0].step
+        self.time = np.array([r.time for r in rockets], dtype=float)
+        # Position
+        self.altitude = np.array([r.position.altitude for r in rockets], dtype=float)
+        self.horizontal = np.array([r.position.horizontal for r in rockets], dtype=float)
+        self.theta = np.array([r.position.theta for r in rockets], dtype=float)
+        self.angle = np.array([r.position.angle for r in rockets], dtype=float)
+        # Velocity
+        self.velocity_radial = np.array([r.velocity.radial for r in rockets], dtype=float)
+        self.velocity_tangential = np.array([r.velocity.tangential for r in rockets], dtype=float)
+        self.velocity_total = np.array([r.velocity.total for r in rockets], dtype=float)
+        # Acceleration
+        self.acceleration_radial = np.array([r.acceleration.radial for r in rockets], dtype=float)
+        self.acceleration_tangential = np.array([r.acceleration.tangential for r in rockets], dtype=float)
+        self.acceleration_total = np.array([r.acceleration.total for r in rockets], dtype=float)
+        self.centripetal_acc = np.array([r.acceleration.centripetal_acc for r in rockets], dtype=float)
+        # Mass
+        self.oxidizer = np.array([r.vehicle.mass.oxidizer for r in rockets], dtype=float)
+        self.fuel = np.array([r.vehicle.mass.fuel for r in rockets], dtype=float)
+        self.propellant = np.array([r.vehicle.mass.propellant for r in rockets], dtype=float)
+        self.dry = np.array([r.vehicle.mass.dry for r in rockets], dtype=float)
+        self.mass = np.array([r.vehicle.mass.total for r in rockets], dtype=float)
+        self.residual_fuel = np.array([r.vehicle.mass.residual_fuel for r in rockets], dtype=float)
+        # Vehicle and engine constants
+        self.oxidizer_flow_rate = np.array([r.vehicle.oxidizer_flow_rate for r in rockets], dtype=float)
+        self.fuel_flow_rate = np.array([r.vehicle.fuel_flow_rate for r in rockets], dtype=float)
+        self.exhaust_velocity = np.array([r.engine.exhaust_velocity for r in rockets], dtype=float)
+        self.drag_coefficent = np.array([r.vehicle.drag_coefficent for r in rockets], dtype=float)
+        self.frontal_area = np.array([r.vehicle.frontal_area_sphere for r in rockets], dtype=float)
+        if len(set(id(r.atmosphere) for r in rockets)) > 1:
+            raise ValueError('All rockets in a batch must use the same atmosphere')
+        self.atmosphere = rockets[0].atmosphere
+        if len(set(id(r.gravity) for r in rockets)) > 1:
+            raise ValueError('All rockets in a batch must use the same gravity model')
+        self.gravity = rockets[0].gravity
+        # Forces
+        self.g = np.zeros(self.size)
+        self.thrust = np.zeros(self.size)
+        self.drag = np.zeros(self.size)
+        self.apogee = self.altitude.copy()    # Highest altitude reached so far
+        # Vehicles that crash are masked out of every later step
+        self.active = np.ones(self.size, dtype=bool)
+        # Last logged row of every vehicle, in rocket.columns order
+        self.last = np.full((len(rocket.columns), self.size), np.nan)
+        self.record = record
+        self.history = []    # Stores preallocated [rows, logged, count] chunks when recording
+
+    def calc(self, calc_time):
+        steps = int(calc_time / self.step)
+        if self.record:
+            self.history.append([np.empty((steps, len(rocket.columns), self.size)),
+                                 np.zeros((steps, self.size), dtype=bool), 0])
+        for _ in range(steps):
+            if not self.active.any():
+                break
+            batch_update_air(self)
+            batch_update_mass(self)
+            batch_calc_forces(self)
+            batch_calc_acceleration(self)
+            batch_calc_velocity(self)
+            batch_calc_position(self)
+            np.maximum(self.apogee, self.altitude, out=self.apogee)
+            batch_calc_log(self)
+            self.time += self.step * self.active
+
+    def final(self):
+        ''' Last logged state of every vehicle as a DataFrame. '''
+        final = pd.DataFrame(self.last.T, columns=rocket.columns)
+        final['apogee'] = self.apogee
+        final['active'] = self.active
+        return final
+
+    def logs(self):
+        ''' Full flight log of every vehicle as a list of DataFrames. Requires record=True. '''
+        if not self.record:
+            raise ValueError('Batch was created with record=False')
+        rows = np.concatenate([chunk[:count] for chunk, _, count in self.history])    # (steps, columns, vehicles)
+        logged = np.concatenate([chunk[:count] for _, chunk, count in self.history])    # (steps, vehicles)
+        return [pd.DataFrame(rows[logged[:, i], :, i], columns=rocket.columns)
+                for i in range(self.size)]
+
+
+def build(setups, start_time=0, record=False, atmosphere=None):
+    return Batch([rocket.build(setup, start_time=start_time, atmosphere=atmosphere) for setup in setups],
+                 record=record)
+
+
+def hand_off(previous, following):
+    # Continues every vehicle of the following batch from the previous batch's state
+    following.time[:] = previous.time
+    following.altitude[:] = previous.altitude
+    following.horizontal[:] = previous.horizontal
+    following.theta[:] = previous.theta
+    following.velocity_radial[:] = previous.velocity_radial
+    following.velocity_tangential[:] = previous.velocity_tangential
+    following.velocity_total[:] = previous.velocity_total
+    following.apogee[:] = previous.apogee
+    following.active &= previous.active
+
+
+def batch_update_air(self):
+    # Vehicles below the surface have crashed, freeze them where they landed
+    crashed = self.active & (self.altitude < 0)
+    if crashed.any():
+        self.altitude[crashed] = -0.1
+        self.active &= ~crashed
+    self.temperature, self.pressure, self.density = self.atmosphere.lookup(self.altitude)
+
+
+def batch_update_mass(self):
+    # Burned out vehicles are masked out of the mass update
+    burning = self.active & (self.propellant > self.residual_fuel)
+    np.subtract(self.oxidizer, self.oxidizer_flow_rate * self.step, out=self.oxidizer, where=burning)
+    np.subtract(self.fuel, self.fuel_flow_rate * self.step, out=self.fuel, where=burning)
+    np.add(self.oxidizer, self.fuel, out=self.propellant, where=burning)
+    np.add(self.dry, self.propellant, out=self.mass, where=burning)
+
+
+def batch_calc_forces(self):
+    R = Earth.radius
+    if self.gravity is gravity.point:
+        self.g = 9.805 * (R / (self.altitude + R)) ** 2
+    else:
+        self.g = self.gravity.radial(self.altitude + R)
+    self.thrust = np.where(self.propellant > self.residual_fuel,
+                           (self.oxidizer_flow_rate + self.fuel_flow_rate) * self.exhaust_velocity, 0.0)
+    relative_velocity = self.velocity_tangential - Earth.velocity_angular * R
+    drag_velocity = (relative_velocity ** 2 + self.velocity_radial ** 2) ** 0.5
+    self.drag = np.where(self.altitude <= self.atmosphere.drag_ceiling,
+                         0.5 * self.drag_coefficent * self.density * drag_velocity ** 2 * self.frontal_area, 0.0)
+
+
+def batch_calc_acceleration(self):
+    active = self.active
+    rocket_acceleration = (self.thrust - self.drag) / self.mass
+    radial_eng_acc = rocket_acceleration * np.cos(self.angle)
+    tangential_eng_acc = rocket_acceleration * np.sin(self.angle)
+    np.copyto(self.centripetal_acc, self.velocity_tangential ** 2 / (self.altitude + Earth.radius), where=active)
+    np.copyto(self.acceleration_radial, radial_eng_acc - self.g + self.centripetal_acc, where=active)
+    np.copyto(self.acceleration_tangential, tangential_eng_acc - (self.velocity_radial * self.velocity_tangential /
+                                                                 (self.altitude + Earth.radius)), where=active)
+    np.copyto(self.acceleration_total, (self.acceleration_tangential ** 2 +
+                                        self.acceleration_radial ** 2) ** 0.5, where=active)
+
+
+def batch_calc_velocity(self):
+    active = self.active
+    np.add(self.velocity_radial, self.acceleration_radial * self.step, out=self.velocity_radial, where=active)
+    np.add(self.velocity_tangential, self.acceleration_tangential * self.step, out=self.velocity_tangential, where=active)
+    np.copyto(self.velocity_total, (self.velocity_radial ** 2 + self.velocity_tangential ** 2) ** 0.5, where=active)
+
+
+def batch_calc_position(self):
+    active = self.active
+    R = Earth.radius
+    np.add(self.altitude, self.velocity_radial * self.step, out=self.altitude, where=active)
+    np.add(self.horizontal, (self.velocity_tangential - Earth.velocity_angular * (R + self.altitude)) * self.step,
+           out=self.horizontal, where=active)
+    # Radians swept around the Earth's centre
+    np.add(self.theta, self.velocity_tangential * self.step / (self.altitude + R),
+           out=self.theta, where=active)
+
+
+def batch_calc_log(self):
+    if self.record:
+        chunk = self.history[-1]
+        row = chunk[0][chunk[2]]
+        chunk[1][chunk[2]] = self.active
+        chunk[2] += 1
+    else:
+        row = np.empty_like(self.last)
+    np.stack([self.time, self.altitude, self.horizontal,
+                    self.velocity_radial, self.velocity_tangential, self.velocity_total,
+                    self.acceleration_radial, self.acceleration_tangential,
+                    self.acceleration_total, self.centripetal_acc,
+                    self.mass, self.thrust, self.drag, self.theta], out=row)
+    np.copyto(self.last, row, where=self.active)
+
+
+Earth = planets.Earth()    # Planet reference information
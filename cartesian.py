@@ -0,0 +1,281 @@
+''' Inertial Cartesian flight of many single stage rockets. Position and velocity
+are (3, vehicles) float64 arrays, one contiguous row per axis, in an Earth
+centred inertial frame, z along the
+rotation axis and x through the prime meridian at each vehicle's launch. The
+Earth's rotation only enters through the launch velocity, the air the vehicle
+flies through and the ground track, so nothing is added and removed by hand.
+
+Altitude, latitude, longitude, downrange arc and the radial and tangential
+views of rocket.py are derived from the state on demand. Launches can be made
+from any latitude along any azimuth. The thrust points angle away from the
+local vertical within the plane of the launch, drag acts against the velocity
+relative to the rotating air. Positions and velocities are advanced with RK4,
+propellant is burned per step as in batch.py. '''
+import math
+import numpy as np
+import pandas as pd
+import planets
+import rocket
+
+
+class Flight(object):
+    ''' Advances many single stage rockets together in an inertial frame. Use metric
+    units. latitude, longitude and azimuth of the launches are in radians and may
+    be arrays, azimuth is measured from north towards east. '''
+
+    def __init__(self, rockets, latitude=0.0, longitude=0.0, azimuth=math.pi / 2, record=False):
+        if len(set(r.step for r in rockets)) > 1:
+            raise ValueError('All rockets in a flight must use the same time step')
+        if any(r.engine.nozzle is not None or r.engine.throttle is not None for r in rockets):
+            raise ValueError('Cartesian flights fly constant exhaust velocity engines only')
+        if any(r.guidance is not None for r in rockets):
+            raise ValueError('Cartesian flights fly fixed angles only')
+        if len(set(id(r.atmosphere) for r in rockets)) > 1 or len(set(id(r.gravity) for r in rockets)) > 1:
+            raise ValueError('All rockets in a flight must use the same atmosphere and gravity model')
+        self.size = len(rockets)
+        self.step = rockets[0].step
+        self.atmosphere = rockets[0].atmosphere
+        self.gravity = rockets[0].gravity
+        self.time = np.array([r.time for r in rockets], dtype=float)
+        self.epoch = self.time.copy()    # Time at which the frame's x axis crosses each launch meridian
+        self.angle = np.array([r.position.angle for r in rockets], dtype=float)
+        # Launch site and heading
+        latitude, longitude, azimuth = (np.broadcast_to(np.asarray(value, dtype=float), (self.size,))
+                                        for value in (latitude, longitude, azimuth))
+        up = np.array([np.cos(latitude) * np.cos(longitude), np.cos(latitude) * np.sin(longitude),
+                       np.sin(latitude)])
+        east = np.array([-np.sin(longitude), np.cos(longitude), np.zeros(self.size)])
+        north = cross(up, east)
+        heading = np.sin(azimuth) * east + np.cos(azimuth) * north
+        self.launch = up    # Unit vector of each launch site at the epoch
+        self.normal = cross(up, heading)    # Normal of the plane the thrust stays in
+        self.cos_angle, self.sin_angle = np.cos(self.angle), np.sin(self.angle)
+        # State
+        altitude = np.array([r.position.altitude for r in rockets], dtype=float)
+        self.position = up * (surface_radius(latitude) + altitude)
+        # rocket.Velocity adds the equator's rotation to the tangential velocity, the
+        # launch velocity over the ground is taken back out and the frame's rotation added
+        ground = np.array([r.velocity.tangential - Earth.velocity_angular * (Earth.radius + r.position.altitude)
+                           for r in rockets], dtype=float)
+        radial = np.array([r.velocity.radial for r in rockets], dtype=float)
+        self.velocity = up * radial + heading * ground + rotation(self.position)
+        self.acceleration = np.zeros((3, self.size))
+        # Mass
+        self.oxidizer = np.array([r.vehicle.mass.oxidizer for r in rockets], dtype=float)
+        self.fuel = np.array([r.vehicle.mass.fuel for r in rockets], dtype=float)
+        self.propellant = np.array([r.vehicle.mass.propellant for r in rockets], dtype=float)
+        self.dry = np.array([r.vehicle.mass.dry for r in rockets], dtype=float)
+        self.mass = np.array([r.vehicle.mass.total for r in rockets], dtype=float)
+        self.residual_fuel = np.array([r.vehicle.mass.residual_fuel for r in rockets], dtype=float)
+        # Vehicle and engine constants
+        self.oxidizer_flow_rate = np.array([r.vehicle.oxidizer_flow_rate for r in rockets], dtype=float)
+        self.fuel_flow_rate = np.array([r.vehicle.fuel_flow_rate for r in rockets], dtype=float)
+        self.exhaust_velocity = np.array([r.engine.exhaust_velocity for r in rockets], dtype=float)
+        self.drag_coefficent = np.array([r.vehicle.drag_coefficent for r in rockets], dtype=float)
+        self.frontal_area = np.array([r.vehicle.frontal_area_sphere for r in rockets], dtype=float)
+        # Forces
+        self.thrust = np.zeros(self.size)
+        self.drag = np.zeros(self.size)
+        self.apogee = self.altitude()    # Highest altitude reached so far
+        self.active = np.ones(self.size, dtype=bool)
+        # Last logged row of every vehicle, in rocket.columns order
+        self.last = np.full((len(rocket.columns), self.size), np.nan)
+        self.record = record
+        self.history = []    # Stores preallocated [rows, logged, count] chunks when recording
+
+    def calc(self, calc_time):
+        steps = int(calc_time / self.step)
+        if self.record:
+            self.history.append([np.empty((steps, len(rocket.columns), self.size)),
+                                 np.zeros((steps, self.size), dtype=bool), 0])
+        for _ in range(steps):
+            # Vehicles below the surface have crashed and stay where they landed, a
+            # millimetre of rounding is allowed for launches from the ellipsoid
+            self.active &= self.altitude() > -1e-3
+            if not self.active.any():
+                break
+            cartesian_update_mass(self)
+            cartesian_step(self)
+            np.maximum(self.apogee, self.altitude(), out=self.apogee)
+            cartesian_calc_log(self)
+            self.time += self.step * self.active
+
+    def radius(self):
+        ''' Distance from the Earth's centre, meters. '''
+        return np.sqrt(dot(self.position, self.position))
+
+    def latitude(self):
+        ''' Geocentric latitude, radians. '''
+        return np.arcsin(self.position[2] / self.radius())
+
+    def longitude(self):
+        ''' Longitude east of each launch meridian's position at the epoch, radians. '''
+        turned = np.arctan2(self.position[1], self.position[0]) - Earth.velocity_angular * (self.time -
+                                                                                                   self.epoch)
+        return (turned + math.pi) % (2 * math.pi) - math.pi
+
+    def altitude(self):
+        ''' Height above the WGS 84 ellipsoid along the radius, meters. '''
+        return self.radius() - surface_radius(self.latitude())
+
+    def theta(self):
+        ''' Angle between the launch site and the vehicle at the Earth's centre,
+        inertial, radians from 0 to pi. '''
+        normal = cross(self.position, self.launch)
+        return np.arctan2(np.sqrt(dot(normal, normal)), dot(self.position, self.launch))
+
+    def downrange(self):
+        ''' Great circle distance over the ground from the launch site, which turns
+        with the Earth, meters. '''
+        turn = Earth.velocity_angular * (self.time - self.epoch)
+        x, y, z = self.launch
+        site = np.array([x * np.cos(turn) - y * np.sin(turn), x * np.sin(turn) + y * np.cos(turn), z])
+        return Earth.radius * np.arccos(np.clip(dot(self.position, site) / self.radius(), -1, 1))
+
+    def radial_velocity(self):
+        ''' Velocity away from the Earth's centre, m/s. '''
+        return dot(self.velocity, self.position) / self.radius()
+
+    def tangential_velocity(self):
+        ''' Inertial horizontal speed, m/s, as rocket.Velocity.tangential. '''
+        radial = self.radial_velocity()
+        return np.sqrt(np.maximum(dot(self.velocity, self.velocity) - radial ** 2, 0))
+
+    def final(self):
+        ''' Last logged state of every vehicle as a DataFrame. '''
+        final = pd.DataFrame(self.last.T, columns=rocket.columns)
+        final['apogee'] = self.apogee
+        final['active'] = self.active
+        final['latitude'] = self.latitude()
+        final['longitude'] = self.longitude()
+        return final
+
+    def logs(self):
+        ''' Full flight log of every vehicle as a list of DataFrames. Requires record=True. '''
+        if not self.record:
+            raise ValueError('Flight was created with record=False')
+        rows = np.concatenate([chunk[:count] for chunk, _, count in self.history])    # (steps, columns, vehicles)
+        logged = np.concatenate([chunk[:count] for _, chunk, count in self.history])    # (steps, vehicles)
+        return [pd.DataFrame(rows[logged[:, i], :, i], columns=rocket.columns)
+                for i in range(self.size)]
+
+
+def build(setups, start_time=0, record=False, atmosphere=None, longitude=0.0, azimuth=math.pi / 2):
+    # Launch latitudes come from the setups, as for zonal gravity
+    return Flight([rocket.build(setup, start_time=start_time, atmosphere=atmosphere) for setup in setups],
+                  latitude=[setup.latitude for setup in setups], longitude=longitude, azimuth=azimuth,
+                  record=record)
+
+
+def hand_off(previous, following):
+    # Continues every vehicle of the following flight from the previous flight's state
+    following.time[:] = previous.time
+    following.epoch[:] = previous.epoch
+    following.launch[:] = previous.launch
+    following.normal[:] = previous.normal
+    following.position[:] = previous.position
+    following.velocity[:] = previous.velocity
+    following.apogee[:] = previous.apogee
+    following.active &= previous.active
+
+
+def cartesian_update_mass(self):
+    # Burned out vehicles are masked out of the mass update
+    burning = self.active & (self.propellant > self.residual_fuel)
+    np.subtract(self.oxidizer, self.oxidizer_flow_rate * self.step, out=self.oxidizer, where=burning)
+    np.subtract(self.fuel, self.fuel_flow_rate * self.step, out=self.fuel, where=burning)
+    np.add(self.oxidizer, self.fuel, out=self.propellant, where=burning)
+    np.add(self.dry, self.propellant, out=self.mass, where=burning)
+    self.thrust = np.where(self.propellant > self.residual_fuel,
+                           (self.oxidizer_flow_rate + self.fuel_flow_rate) * self.exhaust_velocity, 0.0)
+
+
+def cartesian_acceleration(self, position, velocity):
+    # Gravity, thrust and drag at a state, with the mass and thrust of the current step
+    x, y, z = position
+    radius = np.sqrt(x * x + y * y + z * z)
+    up_x, up_y, up_z = x / radius, y / radius, z / radius
+    altitude = radius - Earth.radius_polar / np.sqrt(1 - eccentricity_squared * (1 - up_z * up_z))
+    # Velocity relative to the air, which turns with the Earth
+    relative_x = velocity[0] + Earth.velocity_angular * y
+    relative_y = velocity[1] - Earth.velocity_angular * x
+    relative_z = velocity[2]
+    speed = np.sqrt(relative_x * relative_x + relative_y * relative_y + relative_z * relative_z)
+    # The atmosphere is only looked up while some vehicle is low enough to feel it
+    inside = altitude <= self.atmosphere.drag_ceiling
+    if inside.any():
+        _, _, density = self.atmosphere.lookup(np.maximum(altitude, 0))
+        self.drag = np.where(inside, 0.5 * self.drag_coefficent * density * speed ** 2 * self.frontal_area, 0.0)
+    else:
+        self.drag = np.zeros(self.size)
+    # Thrust lies in the launch plane, angle away from the vertical
+    normal_x, normal_y, normal_z = self.normal
+    thrust = self.thrust / self.mass
+    radial, horizontal = thrust * self.cos_angle, thrust * self.sin_angle
+    against = self.drag / (self.mass * np.maximum(speed, 1e-9))
+    gravity_x, gravity_y, gravity_z = self.gravity.acceleration(x, y, z)
+    return np.array([gravity_x + radial * up_x + horizontal * (normal_y * up_z - normal_z * up_y) - against * relative_x,
+                     gravity_y + radial * up_y + horizontal * (normal_z * up_x - normal_x * up_z) - against * relative_y,
+                     gravity_z + radial * up_z + horizontal * (normal_x * up_y - normal_y * up_x) - against * relative_z])
+
+
+def cartesian_step(self):
+    # Classic RK4 over position and velocity, crashed vehicles are left unchanged
+    step = self.step
+    r, v = self.position, self.velocity
+    a1 = cartesian_acceleration(self, r, v)
+    drag = self.drag
+    a2 = cartesian_acceleration(self, r + 0.5 * step * v, v + 0.5 * step * a1)
+    a3 = cartesian_acceleration(self, r + 0.5 * step * (v + 0.5 * step * a1), v + 0.5 * step * a2)
+    a4 = cartesian_acceleration(self, r + step * (v + 0.5 * step * a2), v + step * a3)
+    np.add(r, step * (v + step / 6 * (a1 + a2 + a3)), out=r, where=self.active)
+    np.add(v, step / 6 * (a1 + 2 * a2 + 2 * a3 + a4), out=v, where=self.active)
+    # The logged forces are those at the start of the step, as in rocket.py
+    self.acceleration, self.drag = a1, drag
+
+
+def cartesian_calc_log(self):
+    if self.record:
+        chunk = self.history[-1]
+        row = chunk[0][chunk[2]]
+        chunk[1][chunk[2]] = self.active
+        chunk[2] += 1
+    else:
+        row = np.empty_like(self.last)
+    radius = self.radius()
+    radial, tangential = self.radial_velocity(), self.tangential_velocity()
+    # Rates of change of the radial and tangential speeds, as rocket.calc_acceleration logs them
+    up = self.position / radius
+    along = (self.velocity - up * radial) / np.maximum(tangential, 1e-9)
+    centripetal = tangential ** 2 / radius
+    radial_acc = dot(self.acceleration, up) + centripetal
+    tangential_acc = dot(self.acceleration, along) - radial * tangential / radius
+    np.stack([self.time, self.altitude(), self.downrange(),
+              radial, tangential, np.sqrt(radial ** 2 + tangential ** 2),
+              radial_acc, tangential_acc, np.sqrt(radial_acc ** 2 + tangential_acc ** 2), centripetal,
+              self.mass, self.thrust, self.drag, self.theta()], out=row)
+    np.copyto(self.last, row, where=self.active)
+
+
+def dot(a, b):
+    # Dot products of (3, vehicles) arrays, one per vehicle
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+
+def cross(a, b):
+    # Cross products of (3, vehicles) arrays
+    return np.array([a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0]])
+
+
+def rotation(position):
+    # Velocity of the rotating Earth's frame at positions, omega x r
+    return Earth.velocity_angular * np.array([-position[1], position[0], np.zeros(position.shape[1])])
+
+
+def surface_radius(latitude):
+    # planets.Earth.surface_radius for arrays of geocentric latitudes
+    return Earth.radius_polar / np.sqrt(1 - eccentricity_squared * np.cos(latitude) ** 2)
+
+
+Earth = planets.Earth()    # Planet reference information
+eccentricity_squared = Earth.flattening * (2 - Earth.flattening)    # Of the WGS 84 ellipsoid
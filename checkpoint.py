@@ -0,0 +1,100 @@
+import os
+import pickle
+import tempfile
+import numpy as np
+import rocket
+
+
+class Checkpoint(object):
+    ''' On-disk checkpoint of a single rocket. Pass one as checkpoint= to
+    rocket.build or Rocket. Rocket.calc then flies in chunks of every steps and
+    saves the flight after each one. A calc call that finds a checkpoint saved
+    by the same flight during the same call continues from it, so rerunning a
+    script after a crash picks up where it stopped.
+    The state is pickled to path. Log rows are appended to path + '.rows' as
+    raw float64, and the state records how many of them are valid. '''
+
+    def __init__(self, path, every=65536):
+        self.path = path
+        self.rows_path = path + '.rows'
+        self.every = every    # Steps between saves
+        self.saved = 0    # Log rows already in the rows file
+
+    def save(self, flight):
+        rows = flight.log[:]
+        entry = {'fingerprint': fingerprint(flight), 'state': rocket.snapshot(flight), 'offset': len(rows),
+                 'last_step': getattr(flight, 'last_step', -1), 'log_events': list(flight.log_events),
+                 'events': list(flight.events), 'detector_values': flight.detector_values,
+                 'previous_row': flight.previous_row, 'max_q': flight.max_q,
+                 'max_q_row': flight.max_q_row, 'max_q_open': flight.max_q_open, 'rows': None}
+        if flight.logging == 'final':
+            entry['rows'] = rows.copy()
+        else:
+            # Only rows logged since the last save are written
+            if len(rows) < self.saved:
+                self.saved = 0
+            with open(self.rows_path, 'ab' if self.saved else 'wb') as output:
+                np.ascontiguousarray(rows[self.saved:]).tofile(output)
+            self.saved = len(rows)
+        # The state goes last, through a temporary file, so it never points past the rows on disk
+        directory = os.path.dirname(os.path.abspath(self.path))
+        handle, temporary = tempfile.mkstemp(dir=directory)
+        with os.fdopen(handle, 'wb') as output:
+            pickle.dump(entry, output, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, self.path)
+
+    def load(self, flight):
+        ''' Saved entry, None if there is none or it was saved by a different flight. '''
+        try:
+            with open(self.path, 'rb') as handle:
+                entry = pickle.load(handle)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return entry if entry['fingerprint'] == fingerprint(flight) else None
+
+    def resume(self, flight, entry):
+        # Puts the flight and its log back into the saved state
+        if flight.log.limit is not None:
+            raise ValueError('Checkpoints restore the whole log, resume into an in-memory FlightLog')
+        rocket.restore(flight, entry['state'])
+        flight.last_step = entry['last_step']
+        flight.log_events[:] = entry['log_events']
+        flight.events[:] = entry['events']
+        flight.detector_values = entry['detector_values']
+        flight.previous_row = entry['previous_row']
+        flight.max_q, flight.max_q_row = entry['max_q'], entry['max_q_row']
+        flight.max_q_open = entry['max_q_open']
+        if entry['rows'] is not None:
+            rows = entry['rows']
+        else:
+            # Rows appended after the state was saved are dropped
+            offset = entry['offset']
+            rows = np.fromfile(self.rows_path, count=offset * len(rocket.columns)).reshape(offset, -1)
+            os.truncate(self.rows_path, rows.nbytes)
+            self.saved = offset
+        flight.log.size = 0
+        flight.log.extend(rows)
+
+    def clear(self):
+        # Removes the checkpoint files
+        for path in (self.path, self.rows_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.saved = 0
+
+
+def fingerprint(flight):
+    # Settings and vehicle constants a checkpoint must share with the flight resuming it
+    return (flight.integrator, flight.step, flight.logging, flight.log_every, flight.kepler,
+            type(flight.atmosphere).__name__, flight.engine.exhaust_velocity, engine_key(flight.engine),
+            flight.gravity.key, getattr(flight.guidance, 'key', None), flight.vehicle.mass.dry,
+            flight.vehicle.mass.residual_fuel, flight.vehicle.drag_coefficent, flight.vehicle.frontal_area_sphere)
+
+
+def engine_key(engine):
+    # Nozzle parameters and throttle profile of an engine, None for a constant engine
+    if engine.nozzle is None and engine.throttle is None:
+        return None
+    nozzle = engine.nozzle
+    return (None if nozzle is None else (nozzle.area_ratio, nozzle.chamber_pressure, nozzle.gamma),
+            engine.throttle)
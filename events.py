@@ -0,0 +1,117 @@
+import hashlib
+import planets
+
+
+class Event(object):
+    ''' Fires when function(rocket) crosses zero between two steps. The crossing
+    is located inside the step by root finding. Functions may also return True or
+    False, the event then fires when the value changes.
+    direction: 1 rising through zero only, -1 falling only, 0 either way.
+    terminal: stops Rocket.calc at the event.
+    condition: what function tests, e.g. ('altitude', 80000), for memo keys. By
+    default it is read off the function, see function_key(). '''
+
+    def __init__(self, name, function, direction=0, terminal=False, condition=None):
+        self.name = name
+        self.function = function
+        self.direction = direction
+        self.terminal = terminal
+        condition = function_key(function) if condition is None else condition
+        # None when the condition cannot be told apart from others, memo.py does not cache such flights
+        self.key = None if condition is None else (name, direction, terminal, condition)
+
+    def __repr__(self):
+        return 'Event(%r, direction=%r, terminal=%r)' % (self.name, self.direction, self.terminal)
+
+    def value(self, rocket):
+        value = self.function(rocket)
+        if isinstance(value, bool):
+            return 1.0 if value else -1.0
+        return value
+
+    def crossed(self, before, after):
+        rising = before < 0 <= after
+        falling = before > 0 >= after
+        if self.direction > 0:
+            return rising
+        if self.direction < 0:
+            return falling
+        return rising or falling
+
+
+def burnout(terminal=False):
+    # Usable propellant runs out
+    return Event('burnout', lambda r: r.vehicle.mass.propellant - r.vehicle.mass.residual_fuel, -1, terminal,
+                 'burnout')
+
+
+def ground(terminal=True):
+    # Impact with the surface, stops the flight by default
+    return Event('ground', lambda r: r.position.altitude, -1, terminal, 'ground')
+
+
+def apogee(terminal=False):
+    return Event('apogee', lambda r: r.velocity.radial, -1, terminal, 'apogee')
+
+
+def max_q(terminal=False):
+    # Dynamic pressure stops rising
+    return Event('max_q', dynamic_pressure_rate, -1, terminal, 'max_q')
+
+
+def altitude(target, direction=0, terminal=False):
+    # Reaching a target altitude in meters
+    return Event('altitude_' + str(target), lambda r: r.position.altitude - target, direction, terminal,
+                 ('altitude', float(target)))
+
+
+def orbital_velocity(terminal=False):
+    # Tangential velocity reaches circular orbit speed at the current altitude
+    return Event('orbital_velocity', lambda r: r.velocity.tangential - circular_velocity(r.position.altitude),
+                 1, terminal, 'orbital_velocity')
+
+
+def predicate(name, function, terminal=False):
+    # User condition, fires when function(rocket) turns True
+    return Event(name, lambda r: bool(function(r)), 1, terminal, function_key(function))
+
+
+def function_key(function):
+    ''' Identity of a plain function: its module, qualified name, bytecode and the
+    numbers or strings it captures. None for other callables, or functions that
+    capture anything else, as those cannot be told apart reliably. '''
+    code = getattr(function, '__code__', None)
+    # A bound method's code does not tell its instances apart
+    if code is None or hasattr(function, '__self__'):
+        return None
+    try:
+        values = [cell.cell_contents for cell in function.__closure__ or ()]
+    except ValueError:    # An empty cell
+        return None
+    values += list(function.__defaults__ or ())
+    if not all(isinstance(value, (bool, int, float, str, type(None))) for value in values):
+        return None
+    constants = [repr(value) for value in code.co_consts
+                 if isinstance(value, (bool, int, float, str, bytes, type(None)))]
+    return (function.__module__, function.__qualname__, hashlib.sha256(code.co_code).hexdigest(),
+            tuple(constants), tuple(code.co_names), tuple(values))
+
+
+def circular_velocity(altitude):
+    # Same gravity model as rocket.calc_forces, g = 9.805 at the surface
+    return (9.805 * Earth.radius ** 2 / (Earth.radius + altitude)) ** 0.5
+
+
+def dynamic_pressure_rate(rocket):
+    # d/dt of 0.5 rho v^2 with the air relative velocity used by rocket.calc_forces
+    altitude = max(rocket.position.altitude, 1)
+    conditions = rocket.atmosphere.conditions
+    density = conditions(altitude)[2]
+    density_slope = (conditions(altitude + 1)[2] - conditions(altitude - 1)[2]) / 2
+    radial = rocket.velocity.radial
+    tangential = rocket.velocity.tangential - Earth.velocity_angular * Earth.radius
+    return (0.5 * density_slope * radial * (radial ** 2 + tangential ** 2) +
+            density * (radial * rocket.acceleration.radial + tangential * rocket.acceleration.tangential))
+
+
+Earth = planets.Earth()    # Planet reference information
@@ -0,0 +1,112 @@
+''' Gravity models. The point mass model is the one rocket.calc_forces has always
+used, g = 9.805 m/s2 at the surface falling with the inverse square, and stays
+the default. Zonal adds the J2, J3 and J4 harmonics of planets.Earth to the
+same central term.
+
+The rockets fly in a plane, so they take the radial part of the field at a fixed
+latitude. Everything that depends on latitude alone is folded into a few
+coefficients when a model is built, leaving a short polynomial in R/r per step.
+radial() and north() accept floats or arrays, and acceleration() gives the full
+vector at Cartesian positions for three dimensional states. '''
+import math
+import numpy as np
+import planets
+
+
+class PointMass(object):
+    ''' Inverse square gravity of a spherical planet. '''
+
+    def __init__(self, mu=None):
+        self.mu = mu if mu is not None else 9.805 * Earth.radius ** 2    # m3/s2
+        self.key = ('point', self.mu)
+
+    def radial(self, radius):
+        ''' Downward acceleration in m/s2 at a distance from the centre in meters. '''
+        return self.mu / radius ** 2
+
+    def north(self, radius):
+        # No component along the meridian
+        return radius * 0.0
+
+    def acceleration(self, x, y, z):
+        ''' Acceleration components in m/s2 at Cartesian positions in meters. '''
+        scale = -self.mu / np.sqrt(x ** 2 + y ** 2 + z ** 2) ** 3
+        return x * scale, y * scale, z * scale
+
+
+class Zonal(object):
+    ''' Point mass plus zonal harmonics up to J<degree> of a planet, evaluated at
+    a fixed geocentric latitude in radians by radial() and north(). mu defaults
+    to the point mass model's, so the two differ by the harmonics alone; pass
+    planet.gm for the planet's measured value. '''
+
+    def __init__(self, planet=None, degree=4, latitude=0.0, mu=None):
+        if not 2 <= degree <= 4:
+            raise ValueError('Zonal gravity is modelled from degree 2 to 4')
+        planet = planet or Earth
+        self.mu = mu if mu is not None else point.mu    # m3/s2
+        self.radius = planet.radius
+        self.degree = degree
+        self.latitude = latitude
+        self.zonal = planet.zonal(degree) + [0] * (4 - degree)
+        self.key = ('zonal', self.mu, self.radius, tuple(self.zonal), latitude)
+        # Radial and north coefficients of (R/r)^n, fixed by the latitude
+        sin, cos = math.sin(latitude), math.cos(latitude)
+        values, slopes = legendre(sin)
+        self.radial_terms = [-(n + 1) * self.zonal[n] * values[n] for n in (2, 3, 4)]
+        self.north_terms = [-self.zonal[n] * slopes[n] * cos for n in (2, 3, 4)]
+
+    def radial(self, radius):
+        ''' Downward acceleration in m/s2 at a distance from the centre in meters. '''
+        q = self.radius / radius
+        c2, c3, c4 = self.radial_terms
+        return self.mu / radius ** 2 * (1 + q * q * (c2 + q * (c3 + q * c4)))
+
+    def north(self, radius):
+        ''' Acceleration towards the north pole in m/s2, out of a rocket's plane. '''
+        q = self.radius / radius
+        c2, c3, c4 = self.north_terms
+        return self.mu / radius ** 2 * q * q * (c2 + q * (c3 + q * c4))
+
+    def acceleration(self, x, y, z):
+        ''' Acceleration components in m/s2 at Cartesian positions in meters,
+        z along the rotation axis. The latitude is taken from each position. '''
+        radius = np.sqrt(x ** 2 + y ** 2 + z ** 2)
+        sin = z / radius
+        q = self.radius / radius
+        values, slopes = legendre(sin)
+        # Radial sum of (n + 1) Jn q^n Pn and meridian sum of Jn q^n Pn'
+        radial = sum((n + 1) * self.zonal[n] * q ** n * values[n] for n in (2, 3, 4))
+        meridian = sum(self.zonal[n] * q ** n * slopes[n] for n in (2, 3, 4))
+        scale = -self.mu / radius ** 2
+        along = scale * (1 - radial - meridian * sin) / radius
+        return x * along, y * along, z * along + scale * meridian
+
+
+def legendre(x):
+    # Legendre polynomials P0 to P4 and their derivatives at x = sin(latitude)
+    x2 = x * x
+    values = [1.0, x, (3 * x2 - 1) / 2, (5 * x2 - 3) * x / 2, (35 * x2 * x2 - 30 * x2 + 3) / 8]
+    slopes = [0.0, 1.0, 3 * x, (15 * x2 - 3) / 2, (35 * x2 - 15) * x / 2]
+    return values, slopes
+
+
+def get(model='point', latitude=0.0):
+    ''' Returns a shared gravity model for a name, 'point', 'j2' or 'zonal' (J2 to
+    J4), at a latitude in radians. Model instances are returned unchanged. '''
+    if not isinstance(model, str):
+        return model
+    if model == 'point':
+        return point
+    key = (model, latitude)
+    if key not in models:
+        if model not in degrees:
+            raise ValueError('Unknown gravity model: ' + str(model))
+        models[key] = Zonal(Earth, degrees[model], latitude)
+    return models[key]
+
+
+Earth = planets.Earth()    # Planet reference information
+point = PointMass()    # The default, shared by every rocket
+degrees = {'j2': 2, 'zonal': 4}    # Highest harmonic of the named zonal models
+models = {}    # Shared zonal instances, keyed by name and latitude
@@ -0,0 +1,100 @@
+''' Pitch programs. A guidance law sets a rocket's angle from the vertical before
+every force evaluation, replacing the fixed angle of each stage. Times are
+flight times in seconds, so a law carries on across stages, and angles are given
+in degrees as in rocket.Setup.
+
+    'table': piecewise-linear angles over time, [(time, degrees), ...]
+    'gravity_turn': vertical until pitch_time, then pitch_angle until the
+        velocity relative to the ground has turned further, which it follows
+    'linear_tangent': vertical until pitch_time, then the tangent of the angle
+        above the horizon falls linearly from pitch_angle to final_angle at
+        final_time
+
+Tables are sampled once when the law is built, so a step costs one lookup. '''
+import math
+import numpy as np
+import planets
+
+
+class Table(object):
+    ''' Piecewise-linear pitch table, held before its first and after its last point. '''
+    resolution = 0.0625    # Seconds, rocket.Rocket's step
+
+    def __init__(self, points):
+        self.key = ('table', tuple((float(time), float(angle)) for time, angle in points))
+        points = sorted((float(time), math.radians(angle)) for time, angle in points)
+        if not points:
+            raise ValueError('A pitch table needs at least one point')
+        self.start, self.end = points[0][0], points[-1][0]
+        self.first, self.last = points[0][1], points[-1][1]
+        # Values and slopes per row, sampled on the resolution grid
+        times, angles = zip(*points)
+        count = int((self.end - self.start) / self.resolution) + 1
+        samples = np.interp(self.start + np.arange(count + 1) * self.resolution, times, angles).tolist()
+        self.rows = list(zip(samples, np.diff(samples).tolist()))
+        self.scale = 1 / self.resolution
+
+    def angle(self, flight):
+        ''' Angle from the vertical in radians at the flight's time. '''
+        if flight.time <= self.start:
+            return self.first
+        if flight.time >= self.end:
+            return self.last
+        x = (flight.time - self.start) * self.scale
+        i = int(x)
+        value, slope = self.rows[i]
+        return value + (x - i) * slope
+
+
+class GravityTurn(object):
+    ''' Vertical rise, a pitch over kick, then along the velocity vector. '''
+
+    def __init__(self, pitch_time, pitch_angle):
+        self.pitch_time = pitch_time    # Seconds
+        self.pitch_angle = math.radians(pitch_angle)
+        self.key = ('gravity_turn', pitch_time, pitch_angle)
+
+    def angle(self, flight):
+        if flight.time < self.pitch_time:
+            return 0.0
+        # Flight path angle from the vertical, over the rotating ground
+        ground = flight.velocity.tangential - Earth.velocity_angular * (Earth.radius + flight.position.altitude)
+        return max(self.pitch_angle, math.atan2(ground, flight.velocity.radial))
+
+
+class LinearTangent(Table):
+    ''' Linear tangent steering, tan(90 - angle) linear in time, as a table. '''
+
+    def __init__(self, pitch_time, pitch_angle, final_angle, final_time):
+        if final_time <= pitch_time:
+            raise ValueError('Linear tangent steering must end after it starts')
+        # Tangents of the elevation above the horizon, kept off the vertical so they stay finite
+        start, end = (math.tan(math.radians(90 - min(max(angle, 1e-6), 90))) for angle in (pitch_angle, final_angle))
+        fractions = np.linspace(0, 1, int((final_time - pitch_time) / self.resolution) + 2)
+        angles = 90 - np.degrees(np.arctan(start + fractions * (end - start)))
+        # Vertical up to the step before pitch_time
+        Table.__init__(self, [(pitch_time - self.resolution, 0.0)] +
+                       list(zip(pitch_time + fractions * (final_time - pitch_time), angles)))
+        self.key = ('linear_tangent', pitch_time, pitch_angle, final_angle, final_time)
+
+
+def get(guidance=None, pitch_table=None, pitch_time=10, pitch_angle=5, final_angle=90, final_time=300):
+    ''' Returns a shared guidance law for the rocket.Setup guidance arguments,
+    None when the stages keep their fixed angles. Law instances are returned unchanged. '''
+    if guidance is None or not isinstance(guidance, str):
+        return guidance
+    if guidance == 'table':
+        key = (guidance, tuple(tuple(point) for point in pitch_table or ()))
+    elif guidance == 'gravity_turn':
+        key = (guidance, pitch_time, pitch_angle)
+    elif guidance == 'linear_tangent':
+        key = (guidance, pitch_time, pitch_angle, final_angle, final_time)
+    else:
+        raise ValueError('Unknown guidance law: ' + str(guidance))
+    if key not in laws:
+        laws[key] = {'table': Table, 'gravity_turn': GravityTurn, 'linear_tangent': LinearTangent}[guidance](*key[1:])
+    return laws[key]
+
+
+Earth = planets.Earth()    # Planet reference information
+laws = {}    # Shared guidance laws, keyed by their arguments
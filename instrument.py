@@ -0,0 +1,53 @@
+import collections
+import contextlib
+import json
+import time
+
+
+class Profile(object):
+    ''' Opt-in timings of a flight. Pass one as profile= to rocket.build, Rocket,
+    mission.Mission or sweep.run, which adds every point's report to points.
+    Flights without a profile take the untimed code paths, so instrumentation
+    costs nothing when it is off. '''
+
+    def __init__(self):
+        self.seconds = collections.defaultdict(float)    # Wall time per phase
+        self.calls = collections.defaultdict(int)    # Calls per phase
+        self.steps = 0    # Integration steps taken
+        self.evaluations = 0    # Force evaluations
+        self.elapsed = 0.0    # Wall time inside Rocket.calc
+        self.log_bytes = 0    # Largest flight log allocated
+        self.stages = []    # Per stage timings of a Mission
+        self.points = []    # Per point reports of a sweep, with their index and wall time
+
+    def add(self, phase, seconds, calls=1):
+        self.seconds[phase] += seconds
+        self.calls[phase] += calls
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        ''' Times a block of code, e.g. building a DataFrame from the log. '''
+        start = clock()
+        try:
+            yield
+        finally:
+            self.add(name, clock() - start)
+
+    def report(self):
+        ''' Timings as a dict of plain values. '''
+        total = sum(self.seconds.values()) or 1
+        return {'phases': {name: {'seconds': seconds, 'calls': self.calls[name], 'share': seconds / total}
+                           for name, seconds in sorted(self.seconds.items(), key=lambda item: -item[1])},
+                'steps': self.steps,
+                'evaluations': self.evaluations,
+                'seconds': self.elapsed,
+                'steps_per_second': self.steps / self.elapsed if self.elapsed else 0.0,
+                'log_bytes': self.log_bytes,
+                'stages': self.stages,
+                'points': self.points}
+
+    def json(self, indent=2):
+        return json.dumps(self.report(), indent=indent)
+
+
+clock = time.perf_counter
@@ -0,0 +1,50 @@
+''' Explicit Runge-Kutta steps for a state held in a list of floats.
+f(t, y) returns dy/dt as a list. Every step takes k1 = f(t, y) from the caller
+and returns the derivative at the new state, so it is evaluated once per step. '''
+
+# Dormand-Prince 5(4) coefficients
+c2, c3, c4, c5 = 1 / 5, 3 / 10, 4 / 5, 8 / 9
+a21 = 1 / 5
+a31, a32 = 3 / 40, 9 / 40
+a41, a42, a43 = 44 / 45, -56 / 15, 32 / 9
+a51, a52, a53, a54 = 19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729
+a61, a62, a63, a64, a65 = 9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656
+b1, b3, b4, b5, b6 = 35 / 384, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84
+# Difference between the 5th and 4th order solutions
+e1, e3, e4, e5, e6, e7 = 71 / 57600, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40
+
+
+def rk4(f, t, y, h, k1):
+    # Classic fourth order Runge-Kutta, 4 evaluations per step
+    k2 = f(t + h / 2, [a + h / 2 * k for a, k in zip(y, k1)])
+    k3 = f(t + h / 2, [a + h / 2 * k for a, k in zip(y, k2)])
+    k4 = f(t + h, [a + h * k for a, k in zip(y, k3)])
+    y_new = [a + h / 6 * (p + 2 * q + 2 * r + s) for a, p, q, r, s in zip(y, k1, k2, k3, k4)]
+    return y_new, f(t + h, y_new)
+
+
+def dormand_prince(f, t, y, h, k1, rtol, atol):
+    # Returns the 5th order solution, its derivative and the scaled RMS error estimate
+    k2 = f(t + c2 * h, [a + h * a21 * p for a, p in zip(y, k1)])
+    k3 = f(t + c3 * h, [a + h * (a31 * p + a32 * q) for a, p, q in zip(y, k1, k2)])
+    k4 = f(t + c4 * h, [a + h * (a41 * p + a42 * q + a43 * r)
+                        for a, p, q, r in zip(y, k1, k2, k3)])
+    k5 = f(t + c5 * h, [a + h * (a51 * p + a52 * q + a53 * r + a54 * s)
+                        for a, p, q, r, s in zip(y, k1, k2, k3, k4)])
+    k6 = f(t + h, [a + h * (a61 * p + a62 * q + a63 * r + a64 * s + a65 * u)
+                   for a, p, q, r, s, u in zip(y, k1, k2, k3, k4, k5)])
+    y_new = [a + h * (b1 * p + b3 * r + b4 * s + b5 * u + b6 * v)
+             for a, p, r, s, u, v in zip(y, k1, k3, k4, k5, k6)]
+    k7 = f(t + h, y_new)
+    error = 0
+    for a, z, p, r, s, u, v, w in zip(y, y_new, k1, k3, k4, k5, k6, k7):
+        scale = atol + rtol * max(abs(a), abs(z))
+        error += (h * (e1 * p + e3 * r + e4 * s + e5 * u + e6 * v + e7 * w) / scale) ** 2
+    return y_new, k7, (error / len(y)) ** 0.5
+
+
+def next_step(h, error, safety=0.9, smallest=0.2, largest=5.0):
+    # Standard step size controller for a 5th order method
+    if error == 0:
+        return h * largest
+    return h * min(largest, max(smallest, safety * error ** -0.2))
@@ -0,0 +1,156 @@
+''' Closed form two-body motion in the rocket's plane of flight. Gravity matches
+rocket.calc_forces, g = 9.805 m/s2 at the surface falling with the inverse square
+of the radius. Anomalies are unwrapped, so they keep growing over several orbits. '''
+import math
+import planets
+
+
+class Orbit(object):
+    ''' Conic through a state given as radius, radial and (inertial) tangential velocity. '''
+
+    def __init__(self, radius, radial, tangential):
+        self.momentum = radius * tangential    # Specific angular momentum, m2/s
+        self.energy = 0.5 * (radial ** 2 + tangential ** 2) - mu / radius    # J/kg
+        self.parameter = self.momentum ** 2 / mu    # Semi-latus rectum, meters
+        # Eccentricity vector in the frame of the current position
+        e_cos = self.parameter / radius - 1
+        e_sin = self.momentum * radial / mu
+        self.eccentricity = math.hypot(e_cos, e_sin)
+        self.anomaly = math.atan2(e_sin, e_cos)    # True anomaly at the epoch
+        if abs(self.eccentricity - 1) < parabolic:
+            self.kind = 'parabola'
+            self.semi_major = math.inf
+            self.motion = 2 * math.sqrt(mu / self.parameter ** 3)
+        else:
+            self.kind = 'ellipse' if self.eccentricity < 1 else 'hyperbola'
+            self.semi_major = self.parameter / (1 - self.eccentricity ** 2)    # Negative for a hyperbola
+            self.motion = math.sqrt(mu / abs(self.semi_major) ** 3)    # Mean motion, rad/s
+        self.epoch = self.mean(self.eccentric(self.anomaly))    # Mean anomaly at the epoch
+
+    @property
+    def period(self):
+        return 2 * math.pi / self.motion if self.kind == 'ellipse' else math.inf
+
+    @property
+    def periapsis(self):
+        return self.parameter / (1 + self.eccentricity)
+
+    @property
+    def apoapsis(self):
+        return self.parameter / (1 - self.eccentricity) if self.kind == 'ellipse' else math.inf
+
+    def eccentric(self, anomaly):
+        # Eccentric (ellipse), hyperbolic or parabolic anomaly from the true anomaly
+        e = self.eccentricity
+        turns = round(anomaly / (2 * math.pi))
+        half = math.tan((anomaly - 2 * math.pi * turns) / 2)
+        if self.kind == 'parabola':
+            return half
+        if self.kind == 'ellipse':
+            return 2 * math.atan(math.sqrt((1 - e) / (1 + e)) * half) + 2 * math.pi * turns
+        return 2 * math.atanh(math.sqrt((e - 1) / (e + 1)) * half)
+
+    def true(self, eccentric):
+        e = self.eccentricity
+        if self.kind == 'parabola':
+            return 2 * math.atan(eccentric)
+        if self.kind == 'ellipse':
+            turns = round(eccentric / (2 * math.pi))
+            wrapped = eccentric - 2 * math.pi * turns
+            return 2 * math.atan(math.sqrt((1 + e) / (1 - e)) * math.tan(wrapped / 2)) + 2 * math.pi * turns
+        return 2 * math.atan(math.sqrt((e + 1) / (e - 1)) * math.tanh(eccentric / 2))
+
+    def mean(self, eccentric):
+        # Kepler's equation, or Barker's equation for a parabola
+        e = self.eccentricity
+        if self.kind == 'parabola':
+            return eccentric + eccentric ** 3 / 3
+        if self.kind == 'ellipse':
+            return eccentric - e * math.sin(eccentric)
+        return e * math.sinh(eccentric) - eccentric
+
+    def solve(self, mean):
+        # Eccentric anomaly for a mean anomaly, Newton's method
+        e = self.eccentricity
+        if self.kind == 'parabola':
+            root = math.sqrt(9 * mean ** 2 / 4 + 1)
+            return math.cbrt(3 * mean / 2 + root) + math.cbrt(3 * mean / 2 - root)
+        if self.kind == 'ellipse':
+            turns = round(mean / (2 * math.pi))
+            wrapped = mean - 2 * math.pi * turns
+            x = wrapped + e * math.sin(wrapped) if e < 0.8 else math.copysign(math.pi, wrapped)
+            for _ in range(50):
+                change = (x - e * math.sin(x) - wrapped) / (1 - e * math.cos(x))
+                x -= change
+                if abs(change) < 1e-14:
+                    break
+            return x + 2 * math.pi * turns
+        x = math.asinh(mean / e)
+        for _ in range(50):
+            change = (e * math.sinh(x) - x - mean) / (e * math.cosh(x) - 1)
+            x -= change
+            if abs(change) < 1e-14 * max(1, abs(x)):
+                break
+        return x
+
+    def at(self, time):
+        ''' Eccentric anomaly time seconds after the epoch. '''
+        return self.solve(self.epoch + self.motion * time)
+
+    def time(self, eccentric):
+        ''' Seconds from the epoch to an eccentric anomaly, negative if before. '''
+        return (self.mean(eccentric) - self.epoch) / self.motion
+
+    def state(self, eccentric):
+        ''' Radius, radial and tangential velocity at an eccentric anomaly. '''
+        anomaly = self.true(eccentric)
+        radius = self.parameter / (1 + self.eccentricity * math.cos(anomaly))
+        return radius, mu / self.momentum * self.eccentricity * math.sin(anomaly), self.momentum / radius
+
+    def arc(self, eccentric):
+        ''' Integrals of radius over true anomaly and of radius over time, from the
+        epoch to an eccentric anomaly. '''
+        end, start = self.integrals(eccentric), self.integrals(self.eccentric(self.anomaly))
+        return end[0] - start[0], end[1] - start[1]
+
+    def integrals(self, x):
+        # Antiderivatives in the eccentric anomaly, r dv = b dE and r dt = r^2 / (a n) dE
+        e, p = self.eccentricity, self.parameter
+        if self.kind == 'parabola':
+            return p * x, p / self.motion * (x + 2 * x ** 3 / 3 + x ** 5 / 5) / 2
+        a = abs(self.semi_major)
+        minor = a * math.sqrt(abs(1 - e ** 2))
+        if self.kind == 'ellipse':
+            return minor * x, a / self.motion * (x - 2 * e * math.sin(x) + e ** 2 * (x / 2 + math.sin(2 * x) / 4))
+        return minor * x, a / self.motion * (e ** 2 * (x / 2 + math.sinh(2 * x) / 4) - 2 * e * math.sinh(x) + x)
+
+    def crossing(self, radius, rising):
+        ''' Seconds from the epoch to the next time the orbit passes a radius going up
+        (rising) or down, None if it never does. '''
+        if radius < self.periapsis or radius > self.apoapsis:
+            return None
+        cosine = (self.parameter / radius - 1) / self.eccentricity if self.eccentricity else 1.0
+        anomaly = math.acos(max(-1.0, min(1.0, cosine)))
+        if not rising:
+            anomaly = -anomaly
+        if self.kind == 'ellipse':
+            # Next such anomaly at or after the epoch
+            anomaly += 2 * math.pi * math.ceil((self.anomaly - anomaly) / (2 * math.pi))
+        elif anomaly < self.anomaly:
+            return None
+        return self.time(self.eccentric(anomaly))
+
+
+def propagate(radius, radial, tangential, time):
+    ''' State after coasting for time seconds as radius, radial and tangential
+    velocity, the change in true anomaly, the integral of radius over true anomaly
+    (inertial arc length) and the integral of radius over time. '''
+    orbit = Orbit(radius, radial, tangential)
+    eccentric = orbit.at(time)
+    arc, area = orbit.arc(eccentric)
+    return orbit.state(eccentric) + (orbit.true(eccentric) - orbit.anomaly, arc, area)
+
+
+Earth = planets.Earth()    # Planet reference information
+mu = 9.805 * Earth.radius ** 2    # Gravitational parameter consistent with rocket.calc_forces, m3/s2
+parabolic = 1e-9    # Eccentricities this close to 1 are treated as parabolic
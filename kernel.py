@@ -0,0 +1,201 @@
+''' Flat state engine for the Euler model of rocket.py. The state is packed into
+float64 arrays and stepped in a single function working on local variables,
+compiled with Numba when it is installed and run as plain Python otherwise.
+Rows are written straight into the flight log's preallocated buffer. Every
+operation matches rocket.py term for term, so results are identical to
+Rocket.calc. Use it through rocket.build(..., kernel=True).
+
+Without Numba the loop is plain Python, not NumPy: an Euler step depends on the
+one before, so one trajectory cannot be vectorized. It only saves the attribute
+lookups of Rocket.calc, about 2x with a full log and 1.5x with the final state.
+The 50-100x of the compiled loop needs Numba. Many rockets at once are
+vectorized across the fleet by batch.py instead. '''
+import math
+import numpy as np
+import atmosphere
+import gravity
+import planets
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Positions in the packed state
+(TIME, ALTITUDE, HORIZONTAL, THETA, ANGLE, VELOCITY_RADIAL, VELOCITY_TANGENTIAL, VELOCITY_TOTAL,
+ ACCELERATION_RADIAL, ACCELERATION_TANGENTIAL, ACCELERATION_TOTAL, CENTRIPETAL, OXIDIZER, FUEL,
+ PROPELLANT, MASS, THRUST, DRAG, G, DYNAMIC_PRESSURE, TEMPERATURE, PRESSURE, DENSITY, STEPS) = range(24)
+
+# Positions in the packed constants
+(STEP, DRY, RESIDUAL, OXIDIZER_FLOW, FUEL_FLOW, EXHAUST_VELOCITY, DRAG_COEFFICENT, FRONTAL_AREA,
+ RADIUS, ANGULAR_VELOCITY, DRAG_CEILING) = range(11)
+
+loggers = {'full': 0, 'every': 1, 'final': 2}    # Logging policies the kernel writes itself
+
+
+def supports(self):
+    ''' Whether the kernel can fly this rocket: the Euler integrator without
+    events, Kepler coasting or profiling, a constant exhaust velocity engine,
+    point mass gravity, fixed angles and the NASA atmosphere, which rockets
+    evaluate by its formula. Other flights keep to Rocket.calc. '''
+    return (self.integrator == 'euler' and not self.detectors and not self.kepler and
+            self.engine.nozzle is None and self.engine.throttle is None and
+            self.gravity is gravity.point and self.guidance is None and
+            self.profile is None and self.logging in loggers and
+            self.atmosphere.conditions is atmosphere.nasa)
+
+
+def pack(self):
+    ''' State and constants of a rocket as two float64 arrays. '''
+    mass, air = self.vehicle.mass, self.air
+    state = np.array([self.time, self.position.altitude, self.position.horizontal, self.position.theta,
+                      self.position.angle, self.velocity.radial, self.velocity.tangential, self.velocity.total,
+                      self.acceleration.radial, self.acceleration.tangential, self.acceleration.total,
+                      self.acceleration.centripetal_acc, mass.oxidizer, mass.fuel, mass.propellant, mass.total,
+                      getattr(self, 'thrust', 0), getattr(self, 'drag', 0), getattr(self, 'g', 0),
+                      self.dynamic_pressure, air.temperature, air.pressure, air.density, self.steps],
+                     dtype=np.float64)
+    constants = np.array([self.step, mass.dry, mass.residual_fuel, self.vehicle.oxidizer_flow_rate,
+                          self.vehicle.fuel_flow_rate, self.engine.exhaust_velocity, self.vehicle.drag_coefficent,
+                          self.vehicle.frontal_area_sphere, Earth.radius, Earth.velocity_angular,
+                          self.atmosphere.drag_ceiling], dtype=np.float64)
+    return state, constants
+
+
+def unpack(self, state):
+    # Writes a packed state back onto the rocket's objects
+    position, velocity, acceleration, mass, air = (self.position, self.velocity, self.acceleration,
+                                                   self.vehicle.mass, self.air)
+    (self.time, position.altitude, position.horizontal, position.theta, position.angle,
+     velocity.radial, velocity.tangential, velocity.total, acceleration.radial, acceleration.tangential,
+     acceleration.total, acceleration.centripetal_acc, mass.oxidizer, mass.fuel, mass.propellant, mass.total,
+     self.thrust, self.drag, self.g, self.dynamic_pressure, air.temperature, air.pressure,
+     air.density, steps) = np.asarray(state).tolist()
+    self.steps = int(steps)
+
+
+def run(state, constants, steps, log, size, policy, log_every, last_step):
+    ''' Takes steps Euler steps from state, logging into log from row size.
+    Returns the number of rows in the log afterwards. '''
+    (time, altitude, horizontal, theta, angle, velocity_radial, velocity_tangential, velocity_total,
+     acceleration_radial, acceleration_tangential, acceleration_total, centripetal, oxidizer, fuel,
+     propellant, mass, thrust, drag, g, dynamic_pressure, temperature, pressure, density) = (
+        state[0], state[1], state[2], state[3], state[4], state[5], state[6], state[7], state[8], state[9],
+        state[10], state[11], state[12], state[13], state[14], state[15], state[16], state[17], state[18],
+        state[19], state[20], state[21], state[22])
+    count = int(state[23])
+    (step, dry, residual, oxidizer_flow, fuel_flow, exhaust_velocity, drag_coefficent, frontal_area,
+     radius, angular_velocity, drag_ceiling) = (
+        constants[0], constants[1], constants[2], constants[3], constants[4], constants[5], constants[6],
+        constants[7], constants[8], constants[9], constants[10])
+    ground_velocity = angular_velocity * radius
+    for _ in range(steps):
+        # rocket.update_air
+        if altitude >= 0:
+            # atmosphere.nasa
+            if altitude < 11000:
+                temperature = 15.04 - .00649 * altitude
+                pressure = 101.29 * ((temperature + 273.1) / 288.08) ** 5.256
+            elif altitude < 25000:
+                temperature = -56.46
+                pressure = 22.65 * math.exp(1.73 - 0.000157 * altitude)
+            else:
+                temperature = -131.21 + .00299 * altitude
+                pressure = 2.488 * ((temperature + 273.1) / 216.6) ** -11.388
+            density = pressure / (0.2869 * (temperature + 273.1))
+        else:
+            altitude = -0.1
+        # rocket.update_mass
+        if propellant > residual:
+            oxidizer -= oxidizer_flow * step
+            fuel -= fuel_flow * step
+            propellant = oxidizer + fuel
+            mass = dry + propellant
+        # rocket.calc_forces
+        g = 9.805 * (radius / (altitude + radius)) ** 2
+        if propellant > residual:
+            thrust = (oxidizer_flow + fuel_flow) * exhaust_velocity
+        else:
+            thrust = 0.0
+        relative_velocity = velocity_tangential - ground_velocity
+        drag_velocity = (relative_velocity ** 2 + velocity_radial ** 2) ** 0.5
+        dynamic_pressure = 0.5 * density * drag_velocity ** 2
+        if altitude <= drag_ceiling:
+            drag = 0.5 * drag_coefficent * density * drag_velocity ** 2 * frontal_area
+        else:
+            drag = 0.0
+        # rocket.calc_acceleration
+        rocket_acceleration = (thrust - drag) / mass
+        centripetal = velocity_tangential ** 2 / (altitude + radius)
+        acceleration_radial = rocket_acceleration * math.cos(angle) - g + centripetal
+        acceleration_tangential = rocket_acceleration * math.sin(angle) - (velocity_radial * velocity_tangential /
+                                                                           (altitude + radius))
+        acceleration_total = (acceleration_tangential ** 2 + acceleration_radial ** 2) ** 0.5
+        # rocket.calc_velocity
+        velocity_radial += acceleration_radial * step
+        velocity_tangential += acceleration_tangential * step
+        velocity_total = (velocity_radial ** 2 + velocity_tangential ** 2) ** 0.5
+        # rocket.calc_position
+        altitude += velocity_radial * step
+        horizontal += (velocity_tangential - angular_velocity * (radius + altitude)) * step
+        theta += velocity_tangential * step / (altitude + radius)
+        # rocket.calc_log, calc_log_every and calc_log_final
+        if policy != 1 or count % log_every == 0 or count == last_step:
+            if policy == 2:
+                size = 0
+            write(log, size, time, altitude, horizontal, velocity_radial, velocity_tangential, velocity_total,
+                  acceleration_radial, acceleration_tangential, acceleration_total, centripetal, mass, thrust,
+                  drag, theta)
+            size += 1
+        time += step
+        count += 1
+    state[0], state[1], state[2], state[3] = time, altitude, horizontal, theta
+    state[5], state[6], state[7] = velocity_radial, velocity_tangential, velocity_total
+    state[8], state[9], state[10], state[11] = acceleration_radial, acceleration_tangential, acceleration_total, centripetal
+    state[12], state[13], state[14], state[15] = oxidizer, fuel, propellant, mass
+    state[16], state[17], state[18], state[19] = thrust, drag, g, dynamic_pressure
+    state[20], state[21], state[22], state[23] = temperature, pressure, density, count
+    return size
+
+
+def write_row(log, size, *row):
+    # One assignment per row is fastest in Python
+    log[size] = row
+
+
+def write_columns(log, size, *row):
+    # Numba fills a row element by element
+    for column in range(len(row)):
+        log[size, column] = row[column]
+
+
+def calc(self, calc_time):
+    ''' Flies a rocket for calc_time seconds like Rocket.calc, with the kernel. '''
+    steps = int(calc_time / self.step)
+    self.last_step = self.steps + steps - 1
+    state, constants = pack(self)
+    if not available:
+        # Plain floats run much faster than numpy scalars in Python
+        state, constants = state.tolist(), constants.tolist()
+    # Logs holding a limited number of rows in memory are filled a piece at a time
+    piece = steps if self.log.limit is None else max(self.log.limit // 2, 1)
+    for start in range(0, steps, piece):
+        count = min(piece, steps - start)
+        # Rows are written in place, so room is made for the most an 'every' log can take
+        self.log.reserve({'full': count,
+                          'every': count // self.log_every + 2,
+                          'final': 1 - self.log.size}[self.logging])
+        self.log.size = advance(state, constants, count, self.log.data, self.log.size,
+                                loggers[self.logging], self.log_every, self.last_step)
+    unpack(self, state)
+    self.evaluations += steps
+
+
+Earth = planets.Earth()    # Planet reference information
+available = numba is not None    # Whether the kernel is compiled
+if available:
+    write = numba.njit(write_columns)
+    advance = numba.njit(cache=True)(run)
+else:
+    write = write_row
+    advance = run
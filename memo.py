@@ -0,0 +1,164 @@
+import collections
+import hashlib
+import json
+import numbers
+import os
+import pickle
+import tempfile
+
+
+class Cache(object):
+    ''' Content-addressed store of flown stages. An in-memory LRU tier sits in
+    front of an optional on-disk tier shared by every process using the same path. '''
+
+    def __init__(self, size=4096, path=None):
+        self.size = size    # Entries kept in memory
+        self.path = path    # Directory of the on-disk tier, None keeps everything in memory
+        self.memory = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return self.memory[key]
+        if self.path is not None:
+            try:
+                with open(self.file(key), 'rb') as handle:
+                    value = pickle.load(handle)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass
+            else:
+                self.remember(key, value)
+                self.hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.remember(key, value)
+        if self.path is not None:
+            # Written to a temporary file first so readers never see a partial entry
+            os.makedirs(os.path.dirname(self.file(key)), exist_ok=True)
+            handle, temporary = tempfile.mkstemp(dir=self.path)
+            with os.fdopen(handle, 'wb') as output:
+                pickle.dump(value, output, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self.file(key))
+
+    def remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.size:
+            self.memory.popitem(last=False)
+
+    def file(self, key):
+        return os.path.join(self.path, key[:2], key + '.pkl')
+
+
+def canonical(value):
+    # Atmosphere instances are described by their class and simple settings
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        return float(value)
+    if hasattr(value, 'conditions') and hasattr(value, 'drag_ceiling'):
+        return [type(value).__name__, sorted((k, v) for k, v in vars(value).items()
+                                             if isinstance(v, (int, float, str)))]
+    # Events are described by what they test, see events.Event
+    if hasattr(value, 'terminal') and hasattr(value, 'key'):
+        return value.key
+    return repr(value)
+
+
+def key(setup, start_time=0, step=0.0625, integrator='euler', **extra):
+    ''' Canonical hash of a Setup's dictionaries, the start time, step, integrator
+    and any extra settings, e.g. the key of the stage flown before this one. '''
+    content = {'position': setup.position, 'velocity': setup.velocity,
+               'acceleration': setup.acceleration, 'engine': setup.engine,
+               'vehicle': setup.vehicle, 'atmosphere': setup.atmosphere,
+               'start_time': start_time, 'step': step, 'integrator': integrator}
+    # Point mass gravity and fixed angles are left out, so older keys stay valid
+    if getattr(setup, 'gravity', 'point') != 'point':
+        content['gravity'] = [setup.gravity, setup.latitude]
+    if getattr(setup, 'guidance', {}).get('guidance') is not None:
+        content['guidance'] = setup.guidance
+    content.update(extra)
+    text = json.dumps(content, sort_keys=True, default=canonical)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def capture(flight):
+    # Stage-end state needed to continue or hand off from a rocket
+    mass = flight.vehicle.mass
+    return {'time': flight.time, 'steps': flight.steps, 'evaluations': flight.evaluations,
+            'altitude': flight.position.altitude, 'horizontal': flight.position.horizontal,
+            'theta': flight.position.theta, 'velocity_radial': flight.velocity.radial,
+            'velocity_tangential': flight.velocity.tangential, 'velocity_total': flight.velocity.total,
+            'oxidizer': mass.oxidizer, 'fuel': mass.fuel, 'propellant': mass.propellant,
+            'mass': mass.total, 'adaptive_step': flight.adaptive_step, 'stopped': flight.stopped,
+            'detector_values': flight.detector_values, 'max_q': flight.max_q,
+            'max_q_row': flight.max_q_row, 'max_q_open': flight.max_q_open}
+
+
+def restore(flight, state):
+    mass = flight.vehicle.mass
+    flight.time, flight.steps, flight.evaluations = state['time'], state['steps'], state['evaluations']
+    flight.position.altitude = state['altitude']
+    flight.position.horizontal = state['horizontal']
+    flight.position.theta = state['theta']
+    flight.velocity.radial = state['velocity_radial']
+    flight.velocity.tangential = state['velocity_tangential']
+    flight.velocity.total = state['velocity_total']
+    mass.oxidizer, mass.fuel = state['oxidizer'], state['fuel']
+    mass.propellant, mass.total = state['propellant'], state['mass']
+    flight.adaptive_step = state['adaptive_step']
+    flight.stopped = state['stopped']
+    # Entries from before detector state was kept start detection afresh
+    flight.detector_values = state.get('detector_values')
+    flight.max_q, flight.max_q_row = state.get('max_q', 0), state.get('max_q_row')
+    flight.max_q_open = state.get('max_q_open', False)
+
+
+def cacheable(flight):
+    ''' Whether a rocket's results can be keyed. Events on a condition that
+    cannot be identified, e.g. a predicate on a bound method, rule caching out. '''
+    return all(detector.key is not None for detector in flight.detectors)
+
+
+def settings(flight):
+    ''' Build options of a rocket that change its trajectory or log, for key().
+    The kernel, checkpoints and profiling leave results unchanged and are left out. '''
+    return {'rtol': flight.rtol, 'atol': flight.atol, 'atmosphere': flight.atmosphere,
+            'events': flight.detectors, 'kepler': flight.kepler, 'logging': flight.logging,
+            'log_every': flight.log_every}
+
+
+def calc(flight, setup, calc_time, cache, start_time=0):
+    ''' Rocket.calc through a cache. flight must be freshly built from setup. '''
+    if not cacheable(flight):
+        flight.calc(calc_time)
+        return flight
+    entry_key = key(setup, start_time, flight.step, flight.integrator, calc_time=calc_time, **settings(flight))
+    entry = cache.get(entry_key)
+    if entry is None:
+        flight.calc(calc_time)
+        cache.put(entry_key, {'state': capture(flight), 'rows': flight.log[:].copy(),
+                              'events': list(flight.log_events), 'located': list(flight.events)})
+    else:
+        restore(flight, entry['state'])
+        flight.log.size = 0
+        flight.log.extend(entry['rows'])
+        flight.log_events[:] = entry['events']
+        flight.events[:] = entry['located']
+    return flight
+
+
+def shared(path=None):
+    ''' One cache per process and path, so process pool workers reuse their entries. '''
+    if path not in caches:
+        caches[path] = Cache(path=path)
+    return caches[path]
+
+
+caches = {}    # Per-process caches, keyed by on-disk path
@@ -0,0 +1,125 @@
+import instrument
+import memo
+import rocket
+
+
+class Mission(object):
+    ''' Flies any number of stages in sequence. Use metric units.
+    staging_delay: seconds each spent stage stays attached after its burn.
+    coast: seconds of unpowered flight after each stage separates, before the
+    next stage ignites. The last entry is flown after the final stage.
+    Both accept a single value for every stage or a list with one per stage.
+    A terminal event, e.g. events.ground() passed as events=[...], ends the mission.
+    cache: a memo.Cache. Each stage is keyed by its setup and the key of the
+    stage before it, so missions sharing leading stages reuse their end states.
+    Missions with events memo.cacheable() cannot key are flown uncached.
+    profile: an instrument.Profile, also given to every stage's rocket.
+    log: the FlightLog every stage writes into, e.g. a stream.StreamLog. '''
+
+    def __init__(self, stages, setup, staging_delay=0, coast=0, start_time=0,
+                 logging='full', log_every=1, cache=None, profile=None, log=None, **options):
+        self.multi_stage = rocket.MultiStage(*stages)
+        self.stages = self.multi_stage.stages
+        self.setup = setup    # Overall rocket, start position and propellants
+        self.staging_delay = per_stage(staging_delay, len(self.stages))
+        self.coast = per_stage(coast, len(self.stages))
+        self.start_time = start_time
+        self.logging = logging
+        self.log_every = log_every
+        self.options = options    # Passed on to rocket.build, e.g. integrator
+        self.cache = cache
+        self.profile = profile
+        # Every stage writes into the same log, so nothing is copied between stages
+        self.log = log if log is not None else rocket.FlightLog(chunk={'final': 1, 'events': 16}.get(logging, 4096))
+        self.log_events = []
+        self.events = []    # Events located by every stage, see events.py
+        self.stopped = None    # Name of the terminal event that ended the mission
+        self.stage_rows = []    # First log row of each stage
+        self.flight = None    # Rocket of the stage currently flying
+
+    def fly(self):
+        previous = stage_key = None
+        previous_coast = 0
+        for number, (stage, delay, coast) in enumerate(zip(self.stages, self.staging_delay, self.coast)):
+            last = number == len(self.stages) - 1
+            started = instrument.clock()
+            stage_setup = rocket.stage_setup(self.setup, self.multi_stage, stage)
+            flight = rocket.build(stage_setup, start_time=self.start_time, logging=self.logging,
+                                  log_every=self.log_every, profile=self.profile, **self.options)
+            if self.profile is not None:
+                self.profile.add('build', instrument.clock() - started)
+            flight.log = self.log
+            flight.log_events = self.log_events
+            flight.events = self.events
+            self.stage_rows.append(len(self.log))
+            self.flight = flight
+            if self.cache is not None and memo.cacheable(flight):
+                stage_key = memo.key(stage_setup, self.start_time, flight.step, flight.integrator,
+                                     previous=stage_key, coast_before=previous_coast,
+                                     burn=stage.burn_time + delay, coast_after=coast if last else 0,
+                                     **memo.settings(flight))
+                entry = self.cache.get(stage_key)
+                if entry is not None:
+                    memo.restore(flight, entry['state'])
+                    if self.logging == 'final':
+                        self.log.size = 0
+                    self.log.extend(entry['rows'])
+                    self.log_events.extend(entry['events'])
+                    self.events.extend(entry['located'])
+                    self.record(stage, started, 0, cached=True)
+                    self.stopped = flight.stopped
+                    if self.stopped:
+                        break
+                    previous, previous_coast = flight, coast
+                    continue
+            first_row = 0 if self.logging == 'final' else len(self.log)
+            first_event, first_located = len(self.log_events), len(self.events)
+            if previous is not None:
+                rocket.hand_off(previous, flight)
+                if previous_coast:
+                    coast_phase(flight, previous_coast)
+            flight.calc(stage.burn_time + delay)
+            if last and coast:
+                coast_phase(flight, coast)
+            if self.cache is not None and memo.cacheable(flight):
+                self.cache.put(stage_key, {'state': memo.capture(flight),
+                                           'rows': self.log[first_row:].copy(),
+                                           'events': self.log_events[first_event:],
+                                           'located': self.events[first_located:]})
+            self.record(stage, started, flight.steps, cached=False)
+            self.stopped = flight.stopped
+            if self.stopped:
+                break
+            previous, previous_coast = flight, coast
+        self.log.flush()
+        return self.log
+
+    def record(self, stage, started, steps, cached):
+        # Per stage timing, when profiling
+        if self.profile is not None:
+            self.profile.stages.append({'stage': stage.stage, 'seconds': instrument.clock() - started,
+                                        'steps': steps, 'cached': cached})
+            self.profile.log_bytes = max(self.profile.log_bytes, self.log.nbytes)
+
+    def final(self):
+        ''' Last logged state as a dict keyed by rocket.columns. '''
+        return dict(zip(rocket.columns, self.log[-1].tolist()))
+
+
+def coast_phase(flight, duration):
+    # Flies with the engine shut off, propellant stays in the tanks
+    vehicle = flight.vehicle
+    flow_rates = vehicle.oxidizer_flow_rate, vehicle.fuel_flow_rate
+    vehicle.oxidizer_flow_rate = vehicle.fuel_flow_rate = 0
+    try:
+        flight.calc(duration)
+    finally:
+        vehicle.oxidizer_flow_rate, vehicle.fuel_flow_rate = flow_rates
+
+
+def per_stage(value, count):
+    if isinstance(value, (list, tuple)):
+        if len(value) != count:
+            raise ValueError('Expected one value per stage')
+        return list(value)
+    return [value] * count
@@ -0,0 +1,107 @@
+import concurrent.futures
+import os
+import numpy as np
+import pandas as pd
+import batch
+import rocket
+import planets
+
+
+class Summary(object):
+    ''' Aggregate statistics of an ensemble, updated one chunk of flights at a time.
+    Only a few numbers per flight are kept, never the flight logs. '''
+
+    def __init__(self, names=('apogee', 'downrange', 'energy')):
+        self.names = list(names)
+        self.count = 0
+        self.successes = 0
+        self.mean = dict.fromkeys(self.names, 0.0)
+        self.sum_squares = dict.fromkeys(self.names, 0.0)    # Squared deviations from the mean
+        self.values = {name: [] for name in self.names}
+
+    def update(self, metrics, success):
+        # Merges a chunk's mean and variance into the running ones (Chan et al.)
+        count = len(success)
+        total = self.count + count
+        for name in self.names:
+            values = np.asarray(metrics[name], dtype=float)
+            delta = values.mean() - self.mean[name]
+            self.mean[name] += delta * count / total
+            self.sum_squares[name] += ((values - values.mean()) ** 2).sum() + delta ** 2 * self.count * count / total
+            self.values[name].append(values)
+        self.count = total
+        self.successes += int(np.count_nonzero(success))
+
+    @property
+    def probability(self):
+        ''' Fraction of successful flights. '''
+        return self.successes / self.count
+
+    @property
+    def standard_error(self):
+        p = self.probability
+        return (p * (1 - p) / self.count) ** 0.5
+
+    def std(self, name):
+        return (self.sum_squares[name] / max(self.count - 1, 1)) ** 0.5
+
+    def percentiles(self, name, bands=(5, 25, 50, 75, 95)):
+        return np.percentile(np.concatenate(self.values[name]), bands)
+
+    def report(self, bands=(5, 25, 50, 75, 95)):
+        ''' Mean, standard deviation and percentile bands of every metric as a DataFrame. '''
+        rows = [[self.mean[name], self.std(name)] + list(self.percentiles(name, bands)) for name in self.names]
+        return pd.DataFrame(rows, index=self.names, columns=['mean', 'std'] + ['p' + str(b) for b in bands])
+
+
+def sample(distributions, count, seed=0):
+    ''' Draws count values of every Setup argument from its distribution.
+    distributions maps a Setup argument to (method, *parameters) of a numpy Generator,
+    e.g. {'drag_coefficent': ('normal', 0.32, 0.02), 'angle': ('uniform', 40, 50)}.
+    The same seed always gives the same samples. '''
+    generator = np.random.default_rng(np.random.SeedSequence(seed))
+    # Sorted so the draws do not depend on the order the distributions were written in
+    return {name: getattr(generator, distributions[name][0])(*distributions[name][1:], size=count)
+            for name in sorted(distributions)}
+
+
+def fly_chunk(setup, samples, flight_time):
+    # Flies one chunk of the ensemble as a batch and returns its metrics
+    count = len(next(iter(samples.values())))
+    setups = [rocket.Setup(**dict(setup, **{name: float(values[i]) for name, values in samples.items()}))
+              for i in range(count)]
+    flight = batch.build(setups)
+    flight.calc(flight_time)
+    final = flight.final()
+    return {'apogee': final['apogee'].values,
+            'downrange': final['horizontal'].values,
+            # gh + 0.5v^2
+            'energy': 9.805 * (Earth.radius + final['altitude'].values) + 0.5 * final['total_vel'].values ** 2,
+            'crashed': ~final['active'].values}
+
+
+def run(setup, distributions, flight_time, count, seed=0, chunk=1024, workers=1, success=None):
+    ''' Monte Carlo dispersion of a single stage flight. setup holds the nominal
+    Setup arguments, the sampled ones replace them. Flights are batched chunk
+    at a time, over a process pool when workers > 1, and folded into a Summary.
+    success is a function of a chunk's metrics returning a boolean array, by
+    default a flight succeeds if it does not hit the ground. '''
+    samples = sample(distributions, count, seed)
+    chunks = [{name: values[i:i + chunk] for name, values in samples.items()} for i in range(0, count, chunk)]
+    success = success or (lambda metrics: ~metrics['crashed'])
+    summary = Summary()
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) < 2:
+        for part in chunks:
+            metrics = fly_chunk(setup, part, flight_time)
+            summary.update(metrics, success(metrics))
+        return summary
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(fly_chunk, setup, part, flight_time) for part in chunks]
+        for future in futures:
+            metrics = future.result()
+            summary.update(metrics, success(metrics))
+    return summary
+
+
+Earth = planets.Earth()    # Planet reference information
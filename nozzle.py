@@ -0,0 +1,95 @@
+''' Ideal nozzle performance with ambient pressure. The effective exhaust
+velocity, thrust per kg/s of propellant or Isp times g, is tabulated once per
+engine over ambient pressure, so a flight step costs one table lookup.
+
+exhaust_velocity is the velocity of the gas leaving the nozzle exit. With the
+area ratio and chamber pressure it fixes the exit pressure and characteristic
+velocity, c* = exhaust_velocity / CF. Thrust per unit mass flow is then
+    exhaust_velocity + (exit_pressure - ambient) * area_ratio * c* / chamber_pressure
+Below Summerfield's separation limit, exit pressure under 0.4 of ambient, the
+flow leaves the wall early and the nozzle acts as if cut off where its
+pressure falls to 0.4 of ambient. '''
+import math
+import numpy as np
+
+
+class Nozzle(object):
+    ''' Effective exhaust velocity table of a nozzle. Pressures in the table are
+    ambient pressures in kPa, as in rocket.Air. '''
+    resolution = 0.05    # kPa
+    ceiling = 120    # kPa, a little above sea level pressure
+
+    def __init__(self, exhaust_velocity, area_ratio, chamber_pressure, gamma=1.2):
+        self.exhaust_velocity = exhaust_velocity    # m/s at the nozzle exit
+        self.area_ratio = area_ratio    # Exit over throat area
+        self.chamber_pressure = chamber_pressure    # Pa
+        self.gamma = gamma    # Ratio of specific heats of the exhaust
+        self.exit_ratio = pressure_ratio(area_ratio, gamma)    # Exit over chamber pressure
+        self.exit_pressure = self.exit_ratio * chamber_pressure    # Pa
+        self.characteristic_velocity = exhaust_velocity / momentum_coefficient(self.exit_ratio, gamma)
+        pressures = np.arange(0, self.ceiling + self.resolution, self.resolution)
+        velocities = self.velocities(pressures)
+        self.scale = 1 / self.resolution
+        # Values and slopes per row, Python lists index faster than arrays in the scalar path
+        slopes = np.diff(velocities, append=velocities[-1])
+        self.rows = list(zip(velocities.tolist(), slopes.tolist()))
+        self.vacuum_velocity = float(velocities[0])
+
+    def velocities(self, pressures):
+        ''' Effective exhaust velocity in m/s for an array of ambient pressures in kPa. '''
+        ambient = np.asarray(pressures, dtype=float) * 1000
+        gamma, chamber = self.gamma, self.chamber_pressure
+        # Full flowing nozzle
+        attached = (self.exhaust_velocity + (self.exit_pressure - ambient) * self.area_ratio *
+                    self.characteristic_velocity / chamber)
+        # Separated flow, the nozzle ends where its pressure is 0.4 of ambient
+        critical = (2 / (gamma + 1)) ** (gamma / (gamma - 1))
+        ratio = np.clip(0.4 * ambient / chamber, self.exit_ratio, critical)
+        separated = (self.characteristic_velocity * momentum_coefficient(ratio, gamma) +
+                     (ratio * chamber - ambient) * area_ratio(ratio, gamma) * self.characteristic_velocity / chamber)
+        return np.where(self.exit_pressure < 0.4 * ambient, separated, attached)
+
+    def velocity(self, pressure):
+        ''' Effective exhaust velocity in m/s at an ambient pressure in kPa. '''
+        x = pressure * self.scale
+        if x >= len(self.rows) - 1 or x < 0:
+            return float(self.velocities([pressure])[0])
+        i = int(x)
+        value, slope = self.rows[i]
+        return value + (x - i) * slope
+
+    def isp(self, pressure):
+        ''' Specific impulse in seconds at an ambient pressure in kPa. '''
+        return self.velocity(pressure) / 9.805
+
+
+def momentum_coefficient(ratio, gamma):
+    # Momentum thrust coefficient, exhaust velocity over c*, at an exit pressure ratio
+    return np.sqrt(2 * gamma ** 2 / (gamma - 1) * (2 / (gamma + 1)) ** ((gamma + 1) / (gamma - 1)) *
+                   (1 - ratio ** ((gamma - 1) / gamma)))
+
+
+def area_ratio(ratio, gamma):
+    # Isentropic area ratio at which the pressure has fallen to ratio of the chamber's
+    return ((2 / (gamma + 1)) ** (1 / (gamma - 1)) * ratio ** (-1 / gamma) /
+            np.sqrt((gamma + 1) / (gamma - 1) * (1 - ratio ** ((gamma - 1) / gamma))))
+
+
+def pressure_ratio(expansion, gamma):
+    # Supersonic exit over chamber pressure for an area ratio, area_ratio() inverted
+    critical = (2 / (gamma + 1)) ** (gamma / (gamma - 1))
+    ratios = np.logspace(-12, math.log10(critical) - 1e-9, 20000)
+    areas = area_ratio(ratios, gamma)
+    # Area falls as the pressure ratio rises, so both are reversed for np.interp
+    return float(np.exp(np.interp(math.log(expansion), np.log(areas[::-1]), np.log(ratios[::-1]))))
+
+
+def get(exhaust_velocity, area_ratio, chamber_pressure, gamma=1.2):
+    ''' Shared Nozzle for a set of parameters, built once per process. '''
+    key = (exhaust_velocity, area_ratio, chamber_pressure, gamma)
+    if key not in nozzles:
+        nozzles[key] = Nozzle(*key)
+    return nozzles[key]
+
+
+nozzles = {}    # Shared instances, keyed by their parameters
@@ -1,6 +1,7 @@
 import matplotlib.pyplot as plt
 import numpy as np
-import rocket, planets
+import concurrent.futures, math, os
+import sweep
 
 def plotter(x, y, kind='scatter', title=None, x_label=None, y_label=None):
 	f, ax = plt.subplots(1, 1)
@@ -11,4 +12,201 @@ def plotter(x, y, kind='scatter', title=None, x_label=None, y_label=None):
 	plt.ylabel(y_label)
 	mng = plt.get_current_fig_manager()
 	mng.resize(*mng.window.maxsize())
-	plt.show()
\ No newline at end of file
+	plt.show()
+
+class Design(object):
+	''' Maps a vector of design variables onto stage_parms and Setup arguments and
+	scores it by final specific energy. variables is a list of (name, stage, lower, upper),
+	stage is the 1-based stage for stage_parms lists or None for a Setup argument.
+	constraints are functions of (stage_parms, setup) that are <= 0 when satisfied. '''
+
+	def __init__(self, stage_parms, setup, variables, constraints=(), staging_delay=0, added_time=0):
+		self.stage_parms = stage_parms
+		self.setup = setup
+		self.variables = variables
+		self.constraints = constraints
+		self.staging_delay = staging_delay
+		self.added_time = added_time
+		self.lower = np.array([v[2] for v in variables], dtype=float)
+		self.upper = np.array([v[3] for v in variables], dtype=float)
+		self.cache = {}    # Scores of simulated designs, keyed by the rounded design vector
+		self.simulations = 0
+
+	def apply(self, x):
+		stage_parms = {key: list(value) if isinstance(value, list) else value for key, value in self.stage_parms.items()}
+		setup = dict(self.setup)
+		for (name, stage, _, _), value in zip(self.variables, x):
+			if stage is None:
+				setup[name] = float(value)
+			else:
+				stage_parms[name][stage - 1] = float(value)
+		return stage_parms, setup
+
+	def feasible(self, x):
+		stage_parms, setup = self.apply(x)
+		return all(constraint(stage_parms, setup) <= 0 for constraint in self.constraints)
+
+	def key(self, x):
+		return tuple(np.round(np.asarray(x, dtype=float), 9))
+
+	def __call__(self, x):
+		return self.evaluate([x])[0]
+
+	def evaluate(self, xs, workers=1):
+		''' Scores designs, simulating only those not already cached, in parallel when workers > 1. '''
+		keys = [self.key(x) for x in xs]
+		todo = []
+		for x, key in zip(xs, keys):
+			if key in self.cache or key in [k for k, _ in todo]:
+				continue
+			if not self.feasible(x):
+				self.cache[key] = -math.inf
+			else:
+				todo.append((key, x))
+		if workers > 1 and len(todo) > 1:
+			with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+				scores = list(executor.map(simulate, [self] * len(todo), [x for _, x in todo]))
+		else:
+			scores = [simulate(self, x) for _, x in todo]
+		for (key, _), score in zip(todo, scores):
+			self.cache[key] = score
+		self.simulations += len(todo)
+		return [self.cache[key] for key in keys]
+
+	def to_unit(self, x):
+		return (np.asarray(x, dtype=float) - self.lower) / (self.upper - self.lower)
+
+	def from_unit(self, u):
+		return self.lower + np.clip(u, 0, 1) * (self.upper - self.lower)
+
+	def result(self):
+		key, score = max(self.cache.items(), key=lambda item: item[1])
+		stage_parms, setup = self.apply(key)
+		return {'x': np.array(key), 'score': score, 'stage_parms': stage_parms, 'setup': setup,
+				'simulations': self.simulations}
+
+
+def simulate(design, x):
+	# Top level so process pools can pickle it
+	stage_parms, setup = design.apply(x)
+	try:
+		return sweep.specific_energy(sweep.fly(stage_parms, setup, design.staging_delay, design.added_time))
+	except (ArithmeticError, ValueError):
+		return -math.inf
+
+
+def nelder_mead(design, x0=None, iterations=100, tolerance=1e-4):
+	''' Maximizes the design score with the Nelder-Mead simplex inside the bounds. '''
+	u = design.to_unit(x0) if x0 is not None else np.full(len(design.variables), 0.5)
+	f = lambda point: design(design.from_unit(point))
+	simplex = [np.clip(u, 0, 1)]
+	for i in range(len(u)):
+		vertex = simplex[0].copy()
+		vertex[i] = vertex[i] + 0.25 if vertex[i] <= 0.5 else vertex[i] - 0.25
+		simplex.append(vertex)
+	scores = [f(vertex) for vertex in simplex]
+	for _ in range(iterations):
+		order = np.argsort(scores)[::-1]
+		simplex = [simplex[i] for i in order]
+		scores = [scores[i] for i in order]
+		if max(np.abs(v - simplex[0]).max() for v in simplex[1:]) < tolerance:
+			break
+		centroid = np.mean(simplex[:-1], axis=0)
+		reflected = np.clip(centroid + (centroid - simplex[-1]), 0, 1)
+		reflected_score = f(reflected)
+		if reflected_score > scores[0]:
+			expanded = np.clip(centroid + 2 * (centroid - simplex[-1]), 0, 1)
+			expanded_score = f(expanded)
+			if expanded_score > reflected_score:
+				simplex[-1], scores[-1] = expanded, expanded_score
+			else:
+				simplex[-1], scores[-1] = reflected, reflected_score
+		elif reflected_score > scores[-2]:
+			simplex[-1], scores[-1] = reflected, reflected_score
+		else:
+			contracted = centroid + 0.5 * (simplex[-1] - centroid)
+			contracted_score = f(contracted)
+			if contracted_score > scores[-1]:
+				simplex[-1], scores[-1] = contracted, contracted_score
+			else:    # Shrinks toward the best vertex
+				simplex = [simplex[0]] + [simplex[0] + 0.5 * (v - simplex[0]) for v in simplex[1:]]
+				scores = [scores[0]] + [f(v) for v in simplex[1:]]
+	return design.result()
+
+
+def gradient(design, x, step=1e-3, workers=1):
+	''' Central finite-difference gradient in unit coordinates, all points simulated together. '''
+	u = design.to_unit(x)
+	points = []
+	for i in range(len(u)):
+		for sign in (1, -1):
+			point = u.copy()
+			point[i] = np.clip(point[i] + sign * step, 0, 1)
+			points.append(point)
+	scores = design.evaluate([design.from_unit(p) for p in points], workers=workers)
+	grad = np.zeros(len(u))
+	for i in range(len(u)):
+		forward, backward = scores[2 * i], scores[2 * i + 1]
+		width = points[2 * i][i] - points[2 * i + 1][i]
+		if math.isfinite(forward) and math.isfinite(backward) and width > 0:
+			grad[i] = (forward - backward) / width
+	return grad
+
+
+def gradient_ascent(design, x0=None, iterations=20, step=0.5, workers=None):
+	''' Projected gradient ascent with a backtracking line search inside the bounds. '''
+	workers = workers or os.cpu_count() or 1
+	u = design.to_unit(x0) if x0 is not None else np.full(len(design.variables), 0.5)
+	score = design(design.from_unit(u))
+	for _ in range(iterations):
+		grad = gradient(design, design.from_unit(u), workers=workers)
+		norm = np.linalg.norm(grad)
+		if norm == 0:
+			break
+		length = step
+		while length > 1e-4:
+			candidate = np.clip(u + length * grad / norm, 0, 1)
+			candidate_score = design(design.from_unit(candidate))
+			if candidate_score > score:
+				break
+			length /= 2
+		else:
+			break
+		if np.abs(candidate - u).max() < 1e-6:
+			break
+		u, score = candidate, candidate_score
+	return design.result()
+
+
+def bayesian(design, initial=6, iterations=14, length_scale=0.3, candidates=2000, seed=0):
+	''' Bayesian optimization: a Gaussian process surrogate fitted to every cached
+	simulation picks the next design by expected improvement. '''
+	rng = np.random.default_rng(seed)
+	n = len(design.variables)
+	# Latin hypercube start
+	start = (np.argsort(rng.random((initial, n)), axis=0) + rng.random((initial, n))) / initial
+	design.evaluate([design.from_unit(u) for u in start])
+	for _ in range(iterations):
+		known = [(design.to_unit(key), score) for key, score in design.cache.items() if math.isfinite(score)]
+		if len(known) < 2:
+			break
+		points = np.array([u for u, _ in known])
+		scores = np.array([score for _, score in known])
+		mean, spread = scores.mean(), scores.std() or 1.0
+		y = (scores - mean) / spread
+		kernel = np.exp(-((points[:, None] - points[None]) ** 2).sum(-1) / (2 * length_scale ** 2))
+		chol = np.linalg.cholesky(kernel + 1e-6 * np.eye(len(points)))
+		alpha = np.linalg.solve(chol.T, np.linalg.solve(chol, y))
+		# Candidates spread over the box and clustered around the best design
+		best = points[np.argmax(y)]
+		trial = np.concatenate([rng.random((candidates // 2, n)),
+								np.clip(best + 0.1 * rng.standard_normal((candidates // 2, n)), 0, 1)])
+		cross = np.exp(-((trial[:, None] - points[None]) ** 2).sum(-1) / (2 * length_scale ** 2))
+		mu = cross @ alpha
+		v = np.linalg.solve(chol, cross.T)
+		sigma = np.sqrt(np.maximum(1 - (v ** 2).sum(0), 1e-12))
+		z = (mu - y.max()) / sigma
+		cdf = 0.5 * (1 + np.vectorize(math.erf)(z / math.sqrt(2)))
+		improvement = (mu - y.max()) * cdf + sigma * np.exp(-z ** 2 / 2) / math.sqrt(2 * math.pi)
+		design(design.from_unit(trial[np.argmax(improvement)]))
+	return design.result()
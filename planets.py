@@ -1,4 +1,23 @@
+import math
+
+
 class Earth(object):
 	def __init__(self):
-		self.radius = 6378137.0    # Meters
-		self.velocity_angular = 7.2921159e-5    # Radians per seconds
\ No newline at end of file
+		self.radius = 6378137.0    # Meters, equatorial
+		self.velocity_angular = 7.2921159e-5    # Radians per second
+		self.gm = 3.986004418e14    # Gravitational parameter, m3/s2
+		# Zonal harmonics of the gravity field, unnormalized
+		self.j2 = 1.08262668e-3
+		self.j3 = -2.53265649e-6
+		self.j4 = -1.61962159e-6
+		self.flattening = 1 / 298.257223563    # WGS 84 ellipsoid
+		self.radius_polar = self.radius * (1 - self.flattening)    # Meters
+
+	def zonal(self, degree):
+		# J2 up to J<degree>, index n holds Jn
+		return [0, 0, self.j2, self.j3, self.j4][:degree + 1]
+
+	def surface_radius(self, latitude):
+		# Distance from the centre to the ellipsoid at a geocentric latitude in radians
+		eccentricity_squared = self.flattening * (2 - self.flattening)
+		return self.radius_polar / math.sqrt(1 - eccentricity_squared * math.cos(latitude) ** 2)
@@ -1,6 +1,16 @@
 import matplotlib.pyplot as plt
+import copy
+import numpy as np
 import pandas as pd
 import math
+import atmosphere as atmospheres
+import gravity as gravities
+import guidance as guidances
+import instrument
+import integrators
+import kernel
+import kepler
+import nozzle as nozzles
 import planets
 
 
@@ -8,28 +18,105 @@ class Rocket(object):
     ''' Describes a single stage rocket. Use metric units. '''
 
     def __init__(self, position, velocity, acceleration, engine,
-                 vehicle, start):
+                 vehicle, start, logging='full', log_every=1,
+                 integrator='euler', rtol=1e-6, atol=1e-3, atmosphere='nasa', events=None,
+                 kepler=False, profile=None, kernel=False, checkpoint=None, log=None, gravity='point',
+                 guidance=None):
         self.time = start    # Rocket start time
+        self.steps = 0    # Number of steps taken
         self.position = position
         self.velocity = velocity
         self.acceleration = acceleration
         self.vehicle = vehicle
         self.engine = engine
         self.air = Air()    # Atmospheric information
+        # Atmosphere model name ('nasa', 'standard', 'bates') or instance, see atmosphere.py
+        self.atmosphere = atmospheres.get(atmosphere)
+        # Gravity model name ('point', 'j2', 'zonal') or instance, see gravity.py
+        self.gravity = gravities.get(gravity)
+        # Pitch program setting position.angle every evaluation, see guidance.py. None keeps it fixed
+        self.guidance = guidance
         # Time step of 0.0625 yielded best results compared to rocket equation
         self.step = 0.0625
-        self.log = []    # Stores flight information
+        # Logging policy: 'full', 'every' log_every steps, 'final' state only or 'events'
+        if logging not in loggers:
+            raise ValueError('Unknown logging policy: ' + str(logging))
+        # Stores flight information, log may be a stream.StreamLog writing it to disk
+        self.log = log if log is not None else FlightLog(chunk={'final': 1, 'events': 16}.get(logging, 4096))
+        self.logging = logging
+        self.log_every = log_every
+        self.log_events = []    # Event names of the logged rows in 'events' mode
+        self.previous_row = None
+        self.dynamic_pressure = 0    # Pa
+        self.max_q = 0    # Highest dynamic pressure so far, Pa
+        self.max_q_row = None    # Its row in 'events' mode until the peak is final and logged
+        self.max_q_open = False    # The last logged row is a max-Q that may still be passed
+        self.calling = False    # Inside the outermost calc call
+        # Integrator: 'euler' (original model), 'rk4' or adaptive Dormand-Prince 'rk45'
+        if integrator not in ('euler', 'rk4', 'rk45'):
+            raise ValueError('Unknown integrator: ' + str(integrator))
+        self.integrator = integrator
+        self.rtol = rtol    # Relative and absolute error tolerances for 'rk45'
+        self.atol = atol
+        self.adaptive_step = self.step    # Next 'rk45' step, adjusted as it flies
+        self.evaluations = 0    # Number of force evaluations
+        # Event hooks checked after every step, see events.py
+        self.detectors = list(events or ())
+        self.detector_values = None    # Detector values after the latest step
+        self.events = []    # Located events as {'name', 'time', 'row'}
+        self.stopped = None    # Name of the terminal event that stopped the flight
+        # Unpowered flight above the atmosphere is propagated in closed form, see kepler.py
+        if kepler and self.gravity is not gravities.point:
+            raise ValueError('Kepler coasting needs point mass gravity')
+        self.kepler = kepler
+        self.profile = profile    # instrument.Profile collecting timings, None when off
+        # Flies Euler steps in the flat state engine of kernel.py when the flight allows it
+        self.kernel = kernel
+        self.checkpoint = checkpoint    # checkpoint.Checkpoint saving the flight to disk, None when off
 
     def calc(self, calc_time):
-        for _ in range(int(calc_time / self.step)):
+        if self.stopped:
+            return
+        if self.logging == 'events' and not self.calling:
+            # Paths may call calc again, the peak of dynamic pressure is logged once they return
+            self.calling = True
+            try:
+                self.calc(calc_time)
+            finally:
+                self.calling = False
+            return calc_log_max_q(self, final=False)
+        if self.checkpoint is not None:
+            return calc_checkpointed(self, calc_time)
+        if self.profile is not None and (self.kepler or self.integrator != 'euler'):
+            return calc_timed(self, calc_time)
+        if self.kepler:
+            return calc_kepler(self, calc_time)
+        if self.integrator != 'euler':
+            return calc_runge_kutta(self, calc_time)
+        if self.kernel and kernel.supports(self):
+            return kernel.calc(self, calc_time)
+        steps = int(calc_time / self.step)
+        self.last_step = self.steps + steps - 1
+        self.log.reserve({'full': steps,
+                          'every': steps // self.log_every + 1,
+                          'final': 1 - len(self.log),
+                          'events': 4}[self.logging])
+        log = loggers[self.logging]
+        if self.profile is not None:
+            return calc_euler_profiled(self, steps, log)
+        if self.detectors:
+            return calc_euler_events(self, steps, log)
+        for _ in range(steps):
             update_air(self)
             update_mass(self)
             calc_forces(self)
             calc_acceleration(self)
             calc_velocity(self)
             calc_position(self)
-            calc_log(self)
+            log(self)
             self.time += self.step
+            self.steps += 1
+        self.evaluations += steps
 
 
 class Setup(object):
@@ -38,7 +125,11 @@ class Setup(object):
                  acceleration_tangential=0, exhaust_velocity=3240,
                  mass=0, mass_fraction=0, mixture_ratio=0, burn_time=0,
                  tank_material=None, fuel=None, oxidizer=None,
-                 safety_factor=1, tank_pressure=0, drag_coefficent=0):
+                 safety_factor=1, tank_pressure=0, drag_coefficent=0,
+                 atmosphere='nasa', residual_fraction=0.02, area_ratio=None,
+                 chamber_pressure=None, gamma=1.2, throttle=None, gravity='point',
+                 latitude=0, guidance=None, pitch_table=None, pitch_time=10, pitch_angle=5,
+                 final_angle=90, final_time=300):
         self.position = {
             'altitude': altitude,
             'angle': angle,
@@ -54,7 +145,11 @@ class Setup(object):
             'acceleration_tangential': acceleration_tangential
         }
         self.engine = {
-            'exhaust_velocity': exhaust_velocity
+            'exhaust_velocity': exhaust_velocity,
+            'area_ratio': area_ratio,
+            'chamber_pressure': chamber_pressure,
+            'gamma': gamma,
+            'throttle': throttle
         }
         self.vehicle = {
             'mass': mass,
@@ -66,17 +161,47 @@ class Setup(object):
             'oxidizer': oxidizer,
             'tank_safety_factor': safety_factor,
             'tank_pressure': tank_pressure,
-            'drag_coefficent': drag_coefficent
+            'drag_coefficent': drag_coefficent,
+            'residual_fraction': residual_fraction
+        }
+        self.atmosphere = atmosphere
+        self.gravity = gravity
+        self.latitude = latitude    # Radians, where zonal gravity is evaluated
+        # Pitch program of every stage, see guidance.get. None flies each stage's angle
+        self.guidance = {
+            'guidance': guidance,
+            'pitch_table': pitch_table,
+            'pitch_time': pitch_time,
+            'pitch_angle': pitch_angle,
+            'final_angle': final_angle,
+            'final_time': final_time
         }
 
 
-def build(setup, start_time=0):
+def build(setup, start_time=0, logging='full', log_every=1, integrator='euler',
+          rtol=1e-6, atol=1e-3, atmosphere=None, events=None, kepler=False, profile=None, kernel=False,
+          checkpoint=None, log=None):
+    # The atmosphere argument overrides the setup's model
     return(Rocket(Position(**setup.position),
                   Velocity(**setup.velocity),
                   Acceleration(**setup.acceleration),
                   Engine(**setup.engine),
                   Vehicle(**setup.vehicle),
-                  start=start_time))
+                  start=start_time,
+                  logging=logging,
+                  log_every=log_every,
+                  integrator=integrator,
+                  rtol=rtol,
+                  atol=atol,
+                  atmosphere=atmosphere or setup.atmosphere,
+                  events=events,
+                  kepler=kepler,
+                  profile=profile,
+                  kernel=kernel,
+                  checkpoint=checkpoint,
+                  log=log,
+                  gravity=gravities.get(setup.gravity, setup.latitude),
+                  guidance=guidances.get(**setup.guidance)))
 
 
 class Stage(object):
@@ -93,22 +218,86 @@ class Stage(object):
 
 
 class MultiStage(object):
-    # Designed for three stages
-    def __init__(self, stage1, stage2, stage3):
-        self.stage1 = stage1
-        self.stage2 = stage2
-        self.stage3 = stage3
-        self.sub_mass_fraction = [
-            self.stage1.wet_mass / (self.stage1.mass + self.stage2.mass + self.stage3.mass),
-            self.stage2.wet_mass / (self.stage2.mass + self.stage3.mass),
-            self.stage3.wet_mass / (self.stage3.mass)]
-
-
-class Vehicle(object):
+    # Any number of stages, first stage first
+    def __init__(self, *stages):
+        self.stages = list(stages)
+        for stage in self.stages:
+            setattr(self, 'stage' + str(stage.stage), stage)
+        # Mass of the stack still attached when each stage ignites
+        self.stack_mass = [sum(s.mass for s in self.stages[i:]) for i in range(len(self.stages))]
+        self.sub_mass_fraction = [stage.wet_mass / stack_mass
+                                  for stage, stack_mass in zip(self.stages, self.stack_mass)]
+
+
+def stage_setup(setup, multi_stage, stage):
+    # Copy of the overall setup with the given stage's mass, burn time and angle
+    index = multi_stage.stages.index(stage)
+    following = copy.copy(setup)
+    following.position = dict(setup.position, angle=stage.angle)
+    following.vehicle = dict(setup.vehicle, mass=multi_stage.stack_mass[index],
+                             propellant_mass_fraction=multi_stage.sub_mass_fraction[index],
+                             burn_time=stage.burn_time)
+    return following
+
+
+def hand_off(previous, following):
+    # Continues the following rocket from the previous rocket's state, in memory
+    following.time = previous.time
+    following.position.altitude = previous.position.altitude
+    following.position.horizontal = previous.position.horizontal
+    following.position.theta = previous.position.theta
+    following.velocity.restore(previous.velocity.snapshot())
+    # Event detection carries on, so a crossing in the first step of the stage is found
+    if len(following.detectors) == len(previous.detectors):
+        following.detector_values = previous.detector_values
+    following.max_q, following.max_q_row = previous.max_q, previous.max_q_row
+    following.max_q_open = previous.max_q_open
+
+
+def snapshot(self):
+    ''' Copy of a rocket's flight state as nested tuples, see restore(). '''
+    return (self.time, self.steps, self.evaluations, self.adaptive_step, self.stopped,
+            self.position.snapshot(), self.velocity.snapshot(), self.acceleration.snapshot(),
+            self.air.snapshot(), self.vehicle.snapshot())
+
+
+def restore(self, snapshot):
+    # Puts a rocket back into the state of a snapshot
+    (self.time, self.steps, self.evaluations, self.adaptive_step, self.stopped,
+     position, velocity, acceleration, air, vehicle) = snapshot
+    self.position.restore(position)
+    self.velocity.restore(velocity)
+    self.acceleration.restore(acceleration)
+    self.air.restore(air)
+    self.vehicle.restore(vehicle)
+
+
+class State(object):
+    ''' Base of the slotted state objects. snapshot() copies the values into a
+    tuple, restore() puts them back, nested state objects included. '''
+    __slots__ = ()
+
+    def snapshot(self):
+        return tuple(getattr(self, name).snapshot() if isinstance(getattr(self, name), State)
+                     else getattr(self, name) for name in self.__slots__)
+
+    def restore(self, snapshot):
+        for name, value in zip(self.__slots__, snapshot):
+            if isinstance(getattr(self, name), State):
+                getattr(self, name).restore(value)
+            else:
+                setattr(self, name, value)
+
+
+class Vehicle(State):
+    __slots__ = ('mass', 'oxidizer_volume', 'fuel_volume', 'oxidizer_sphere_radius', 'fuel_sphere_radius',
+                 'frontal_area_sphere', 'oxidizer_wall_thickness', 'fuel_wall_thickness', 'oxidizer_mass',
+                 'fuel_mass', 'oxidizer_flow_rate', 'fuel_flow_rate', 'drag_coefficent')
+
     def __init__(self, mass, propellant_mass_fraction, mixture_ratio,
                  burn_time, tank_material, fuel, oxidizer, tank_safety_factor,
-                 tank_pressure, drag_coefficent):
-        self.mass = Mass(mass, propellant_mass_fraction, mixture_ratio)
+                 tank_pressure, drag_coefficent, residual_fraction=0.02):
+        self.mass = Mass(mass, propellant_mass_fraction, mixture_ratio, residual_fraction)
         self.oxidizer_volume = self.mass.oxidizer / oxidizer_density[oxidizer]
         self.fuel_volume = self.mass.fuel / fuel_density[fuel]
         self.oxidizer_sphere_radius = ((3 * self.oxidizer_volume) /
@@ -133,8 +322,10 @@ class Vehicle(object):
         self.drag_coefficent = drag_coefficent
 
 
-class Mass(object):
-    def __init__(self, mass, propellant_mass_fraction, mixture_ratio):
+class Mass(State):
+    __slots__ = ('total', 'propellant_fraction', 'dry', 'propellant', 'oxidizer', 'fuel', 'residual_fuel')
+
+    def __init__(self, mass, propellant_mass_fraction, mixture_ratio, residual_fraction=0.02):
         # Rocket's mass at launch
         self.total = mass    # !Does not incorporate tank mass!
         # Propellant mass fraction = wet mass at launch / full mass at launch
@@ -143,11 +334,13 @@ class Mass(object):
         self.propellant = self.total - self.dry
         self.oxidizer = (mixture_ratio * self.propellant) / (mixture_ratio + 1)
         self.fuel = self.propellant / (mixture_ratio + 1)
-        # !Assuming 2% unused fuel!
-        self.residual_fuel = mass * propellant_mass_fraction * 0.02
+        # Propellant left unused in the tanks, 2% by default
+        self.residual_fuel = mass * propellant_mass_fraction * residual_fraction
+
 
+class Position(State):
+    __slots__ = ('altitude', 'horizontal', 'theta', 'angle')
 
-class Position(object):
     def __init__(self, altitude=0, horizontal=0, angle=0):
         self.altitude = altitude    # Initial height above the surface, meters
         self.horizontal = horizontal    # Arc distance travelled down range
@@ -161,7 +354,9 @@ class Position(object):
         self.angle = angle * (math.pi / 180)
 
 
-class Velocity(object):
+class Velocity(State):
+    __slots__ = ('radial', 'tangential', 'total')
+
     def __init__(self, velocity_radial=0, velocity_tangential=0, altitude=0):
         self.radial = velocity_radial
         # !Assume a stationary position over ground launch site if rocket is launched from a balloon!
@@ -169,7 +364,9 @@ class Velocity(object):
         self.total = (self.radial ** 2 + self.tangential ** 2) ** 0.5
 
 
-class Acceleration(object):
+class Acceleration(State):
+    __slots__ = ('radial', 'tangential', 'total', 'centripetal_acc')
+
     def __init__(self, acceleration_radial=0, acceleration_tangential=0):
         self.radial = acceleration_radial
         self.tangential = acceleration_tangential
@@ -177,77 +374,171 @@ class Acceleration(object):
         self.centripetal_acc = 0
 
 
-class Air(object):
+class Air(State):
+    __slots__ = ('temperature', 'pressure', 'density')
+
     def __init__(self):    # Outside air conditions
         self.temperature = 0    # Celsius
         self.pressure = 0    # kPa
         self.density = 0    # kg/m3
 
 
-class Engine(object):
-    def __init__(self, exhaust_velocity):
-        self.exhaust_velocity = exhaust_velocity    # !Needs to be developed!
+class Engine(State):
+    ''' Constant exhaust velocity by default. With an area ratio and chamber
+    pressure (Pa) thrust follows the ambient pressure through a nozzle.Nozzle
+    table. throttle: [(time, fraction), ...] over flight time in seconds,
+    interpolated linearly and held beyond its ends. Throttling scales the
+    propellant flow and the chamber pressure with it. '''
+    __slots__ = ('exhaust_velocity', 'nozzle', 'throttle')
+
+    def __init__(self, exhaust_velocity, area_ratio=None, chamber_pressure=None, gamma=1.2, throttle=None):
+        self.exhaust_velocity = exhaust_velocity    # m/s
+        self.nozzle = None
+        if area_ratio is not None:
+            self.nozzle = nozzles.get(exhaust_velocity, area_ratio, chamber_pressure, gamma)
+        self.throttle = [tuple(point) for point in throttle] if throttle else None
+
+    def setting(self, time):
+        ''' Throttle fraction at a flight time. '''
+        points = self.throttle
+        if time <= points[0][0]:
+            return points[0][1]
+        for (start, low), (end, high) in zip(points, points[1:]):
+            if time < end:
+                return low + (high - low) * (time - start) / (end - start)
+        return points[-1][1]
+
+    def velocity(self, pressure, throttle=1):
+        ''' Effective exhaust velocity at an ambient pressure in kPa. '''
+        if self.nozzle is None:
+            return self.exhaust_velocity
+        # Exit pressure falls with the chamber pressure, like raising the ambient one
+        return self.nozzle.velocity(pressure / throttle)
+
+
+class FlightLog(object):
+    ''' Columnar flight log. Rows are preallocated by calc() and appends past the
+    end grow it by at least chunk rows. '''
+    limit = None    # Rows held in memory at most, None for no limit
+
+    def __init__(self, capacity=0, chunk=4096):
+        self.chunk = chunk
+        self.size = 0
+        # Column-major so every column is a contiguous float64 array
+        self.data = np.empty((capacity, len(columns)), order='F')
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        return self.data[:self.size][index]
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def reserve(self, rows):
+        # Makes room for at least the given number of additional rows. The first
+        # reservation is exact, so a decimated or short flight holds only its own
+        # rows. Later ones grow geometrically so many short calc() calls copy the
+        # log only a few times.
+        needed = self.size + rows
+        if needed > len(self.data):
+            data = np.empty((max(needed, 2 * len(self.data)), len(columns)), order='F')
+            data[:self.size] = self.data[:self.size]
+            self.data = data
+
+    def append(self, row):
+        if self.size == len(self.data):
+            self.reserve(max(self.chunk, self.size // 2))
+        self.data[self.size] = row
+        self.size += 1
+
+    def extend(self, other):
+        # Appends the rows of another FlightLog or of a 2D array
+        rows = other.data[:len(other)] if isinstance(other, FlightLog) else other
+        self.reserve(len(rows))
+        self.data[self.size:self.size + len(rows)] = rows
+        self.size += len(rows)
+
+    def flush(self):
+        # Everything is in memory already, see stream.StreamLog
+        pass
+
+    def column(self, name):
+        return self.data[:self.size, columns.index(name)]
+
+    def frame(self):
+        ''' Zero-copy DataFrame view of the log. Copy it before modifying. '''
+        return pd.DataFrame(self.data[:self.size], columns=columns, copy=False)
 
 
 def update_air(self):
-    # NASA atmospheric model | https://www.grc.nasa.gov/www/k-12/rocket/atmosmet.html
-    if self.position.altitude >= 0 and self.position.altitude < 11000:
-        # Celsius
-        self.air.temperature = 15.04 - .00649 * self.positon.altitude
-        # kPa
-        self.air.pressure = 101.29 * ((self.air.temperature + 273.1) / 288.08) ** 5.256
-    elif self.position.altitude >= 11000 and self.position.altitude < 25000:
-        # Celsius
-        self.air.temperature = -56.46
-        # kPa
-        self.air.pressure = 22.65 * math.exp(1.73 - 0.000157 * self.position.altitude)
-    elif self.position.altitude >= 25000:
-        # Celsius
-        self.air.temperature = -131.21 + .00299 * self.position.altitude
-        # kPa
-        self.air.pressure = 2.488 * ((self.air.temperature + 273.1) / 216.6) ** -11.388
+    if self.position.altitude >= 0:
+        # From the atmosphere model, see atmosphere.py
+        self.air.temperature, self.air.pressure, self.air.density = \
+            self.atmosphere.conditions(self.position.altitude)
     else:
         self.position.altitude = -0.1
-    # Air density in kg/m3
-    self.air.density = self.air.pressure / (0.2869 * (self.air.temperature + 273.1))
 
 
 def update_mass(self):
     # Prevents mass reduction after rocket uses all available fuel
     if self.vehicle.mass.propellant > self.vehicle.mass.residual_fuel:
-        self.vehicle.mass.oxidizer -= self.vehicle.oxidizer_flow_rate * self.step
-        self.vehicle.mass.fuel -= self.vehicle.fuel_flow_rate * self.step
+        step = self.step if self.engine.throttle is None else self.step * self.engine.setting(self.time)
+        self.vehicle.mass.oxidizer -= self.vehicle.oxidizer_flow_rate * step
+        self.vehicle.mass.fuel -= self.vehicle.fuel_flow_rate * step
         self.vehicle.mass.propellant = self.vehicle.mass.oxidizer + self.vehicle.mass.fuel
         self.vehicle.mass.total = self.vehicle.mass.dry + self.vehicle.mass.propellant
 
 
 def calc_forces(self):
         # Calculate Earth's gravitional constant base on altitude
-    self.g = 9.805 * (Earth.radius / (self.position.altitude + Earth.radius)) ** 2
+    if self.gravity is gravities.point:
+        self.g = 9.805 * (Earth.radius / (self.position.altitude + Earth.radius)) ** 2
+    else:
+        self.g = self.gravity.radial(self.position.altitude + Earth.radius)
     # Calculate rocket's thrust based on fuel & oxidizer consumption rate and gas exhaust velocity
     if self.vehicle.mass.propellant > self.vehicle.mass.residual_fuel:
-        self.thrust = ((self.vehicle.oxidizer_flow_rate +
-                        self.vehicle.fuel_flow_rate) * self.engine.exhaust_velocity)
+        if self.engine.nozzle is None and self.engine.throttle is None:
+            self.thrust = ((self.vehicle.oxidizer_flow_rate +
+                            self.vehicle.fuel_flow_rate) * self.engine.exhaust_velocity)
+        else:
+            self.thrust = engine_thrust(self)
     else:
         self.thrust = 0
     # Calculate rocket's drag based on vehicle's velocity relative to the surrounding air
     relative_velocity = self.velocity.tangential - Earth.velocity_angular * Earth.radius
     drag_velocity = (relative_velocity ** 2 + self.velocity.radial ** 2) ** 0.5
-    if self.position.altitude <= 80000:
+    self.dynamic_pressure = 0.5 * self.air.density * drag_velocity ** 2
+    if self.position.altitude <= self.atmosphere.drag_ceiling:
         self.drag = (0.5 * self.vehicle.drag_coefficent * self.air.density * drag_velocity**2 * self.vehicle.frontal_area_sphere)
     else:
         self.drag = 0
 
 
+def engine_thrust(self):
+    # Throttled and ambient pressure dependent thrust, see Engine
+    throttle = 1 if self.engine.throttle is None else self.engine.setting(self.time)
+    if throttle <= 0:
+        return 0
+    flow = (self.vehicle.oxidizer_flow_rate + self.vehicle.fuel_flow_rate) * throttle
+    return flow * self.engine.velocity(self.air.pressure, throttle)
+
+
 def calc_acceleration(self):
     # Reference plane is Earth's equator
+    if self.guidance is not None:
+        self.position.angle = self.guidance.angle(self)
     rocket_acceleration = (self.thrust - self.drag) / self.vehicle.mass.total
     radial_eng_acc = rocket_acceleration * math.cos(self.position.angle)
     tangential_eng_acc = rocket_acceleration * math.sin(self.position.angle)
-    self.centripetal_acc = self.velocity.tangential ** 2 / (self.position.altitude + Earth.radius)
+    self.acceleration.centripetal_acc = self.velocity.tangential ** 2 / (self.position.altitude + Earth.radius)
     # Radial acceleration from thrust - Earth's gravitational acceleration + centripetal acceleration
-    self.acceleration.radial = radial_eng_acc - self.g + self.centripetal_acc
-    self.acceleration.tangential = tangential_eng_acc
+    self.acceleration.radial = radial_eng_acc - self.g + self.acceleration.centripetal_acc
+    # Tangential velocity is inertial, so rising trades it for height and conserves angular momentum
+    self.acceleration.tangential = tangential_eng_acc - (self.velocity.radial * self.velocity.tangential /
+                                                         (self.position.altitude + Earth.radius))
     self.acceleration.total = (self.acceleration.tangential ** 2 +
                                self.acceleration.radial ** 2) ** 0.5
 
@@ -267,46 +558,536 @@ def calc_position(self):
     self.position.horizontal += (self.velocity.tangential -
                                  Earth.velocity_angular * (Earth.radius +
                                                            self.position.altitude)) * self.step
-    # Radians !Not working!
-    self.position.theta += math.atan(self.velocity.tangential * self.step) / (self.position.altitude + Earth.radius)
+    # Radians swept around the Earth's centre, tangential velocity over radius
+    self.position.theta += self.velocity.tangential * self.step / (self.position.altitude + Earth.radius)
+
+
+def get_state(self):
+    # Integrated state vector for the Runge-Kutta integrators
+    return [self.position.altitude, self.position.horizontal, self.position.theta,
+            self.velocity.radial, self.velocity.tangential,
+            self.vehicle.mass.oxidizer, self.vehicle.mass.fuel]
+
+
+def set_state(self, state):
+    mass = self.vehicle.mass
+    (self.position.altitude, self.position.horizontal, self.position.theta,
+     self.velocity.radial, self.velocity.tangential, mass.oxidizer, mass.fuel) = state
+    self.velocity.total = (self.velocity.radial ** 2 + self.velocity.tangential ** 2) ** 0.5
+    mass.propellant = mass.oxidizer + mass.fuel
+    mass.total = mass.dry + mass.propellant
+
+
+def derivatives(self, time, state):
+    # Evaluates the same physics as the Euler step at an arbitrary state
+    self.evaluations += 1
+    set_state(self, state)
+    update_air(self)
+    # Forces of a throttled engine and guided angles depend on the time of the evaluation
+    now, self.time = self.time, time
+    calc_forces(self)
+    calc_acceleration(self)
+    self.time = now
+    radius = self.position.altitude + Earth.radius
+    if self.vehicle.mass.propellant > self.vehicle.mass.residual_fuel:
+        throttle = 1 if self.engine.throttle is None else self.engine.setting(time)
+        oxidizer_rate = -self.vehicle.oxidizer_flow_rate * throttle
+        fuel_rate = -self.vehicle.fuel_flow_rate * throttle
+    else:
+        oxidizer_rate = fuel_rate = 0
+    return [self.velocity.radial,
+            self.velocity.tangential - Earth.velocity_angular * radius,
+            self.velocity.tangential / radius,
+            self.acceleration.radial, self.acceleration.tangential,
+            oxidizer_rate, fuel_rate]
+
+
+def calc_runge_kutta(self, calc_time):
+    # Logs the state at the end of each accepted step
+    def f(time, state):
+        return derivatives(self, time, state)
+    log = loggers[self.logging]
+    state = get_state(self)
+    rate = f(self.time, state)
+    if self.integrator == 'rk4':
+        steps = int(calc_time / self.step)
+        self.last_step = self.steps + steps - 1
+        for _ in range(steps):
+            start = self.time, state
+            state, rate = integrators.rk4(f, self.time, state, self.step, rate)
+            self.time += self.step
+            if self.detectors and detect_events(self, start, self.step, advance_runge_kutta):
+                break
+            log(self)
+            self.steps += 1
+        return
+    end = self.time + calc_time
+    step = self.adaptive_step
+    self.last_step = -1
+    while end - self.time > 1e-9:
+        final = step >= end - self.time
+        if final:
+            step = end - self.time
+        new_state, new_rate, error = integrators.dormand_prince(f, self.time, state, step, rate,
+                                                                self.rtol, self.atol)
+        if error > 1:    # Rejected, retry with a smaller step
+            step = integrators.next_step(step, error)
+            continue
+        start = self.time, state
+        state, rate = new_state, new_rate
+        self.time = end if final else self.time + step
+        if final:
+            self.last_step = self.steps
+        if self.detectors and detect_events(self, start, step, advance_runge_kutta):
+            return
+        log(self)
+        self.steps += 1
+        step = integrators.next_step(step, error)
+        if not final:
+            self.adaptive_step = step
+    set_state(self, state)
+
+
+def calc_euler_profiled(self, steps, log):
+    # The Euler loop with every phase timed, see instrument.py
+    clock = instrument.clock
+    names = ['update_air', 'update_mass', 'calc_forces', 'calc_acceleration', 'calc_velocity', 'calc_position']
+    phases = [update_air, update_mass, calc_forces, calc_acceleration, calc_velocity, calc_position]
+    seconds = [0.0] * len(phases)
+    logging = detecting = 0.0
+    start = clock()
+    taken = 0
+    for taken in range(1, steps + 1):
+        state = self.time, get_state(self) if self.detectors else None
+        for i, phase in enumerate(phases):
+            before = clock()
+            phase(self)
+            seconds[i] += clock() - before
+        if self.detectors:
+            before = clock()
+            stopped = detect_events(self, state, self.step, advance_euler)
+            detecting += clock() - before
+            if stopped:
+                break
+        before = clock()
+        log(self)
+        logging += clock() - before
+        self.time += self.step
+        self.steps += 1
+    self.evaluations += taken
+    profile = self.profile
+    for name, elapsed in zip(names, seconds):
+        profile.add(name, elapsed, taken)
+    profile.add('log', logging, taken)
+    if self.detectors:
+        profile.add('events', detecting, taken)
+    profile.elapsed += clock() - start
+    profile.steps += taken
+    profile.evaluations += taken
+    profile.log_bytes = max(profile.log_bytes, self.log.nbytes)
+
+
+def calc_timed(self, calc_time):
+    # Times a whole calc call on the paths without per phase timing
+    profile, self.profile = self.profile, None
+    steps, evaluations, start = self.steps, self.evaluations, instrument.clock()
+    try:
+        self.calc(calc_time)
+    finally:
+        self.profile = profile
+    elapsed = instrument.clock() - start
+    profile.add('kepler' if self.kepler else self.integrator + ('_events' if self.detectors else ''), elapsed)
+    profile.elapsed += elapsed
+    profile.steps += self.steps - steps
+    profile.evaluations += self.evaluations - evaluations
+    profile.log_bytes = max(profile.log_bytes, self.log.nbytes)
+
+
+def calc_checkpointed(self, calc_time):
+    # Flies in chunks of checkpoint.every steps and saves after each one.
+    # Fixed step flights count steps, adaptive and Kepler flights count time.
+    checkpoint, self.checkpoint = self.checkpoint, None
+    try:
+        fixed = self.integrator != 'rk45' and not self.kepler
+        if fixed:
+            steps = int(calc_time / self.step)
+            end = self.steps + steps
+            # Room for the whole call at once, chunks would otherwise grow the log one by one
+            self.log.reserve({'full': steps, 'every': steps // self.log_every + 1}.get(self.logging, 0))
+        else:
+            end = self.time + calc_time
+        entry = checkpoint.load(self)
+        saved = None if entry is None else entry['state'][1] if fixed else entry['state'][0]
+        if saved is not None and (self.steps if fixed else self.time) < saved <= end:
+            checkpoint.resume(self, entry)
+        # A checkpoint from a later call is kept while this one is flown again
+        ahead = saved is not None and saved > end
+        while not self.stopped:
+            if fixed:
+                chunk = min(checkpoint.every, end - self.steps) * self.step
+            else:
+                chunk = min(checkpoint.every * self.step, end - self.time)
+            if chunk <= (0 if fixed else 1e-9):
+                break
+            self.calc(chunk)
+            last = self.steps >= end if fixed else end - self.time <= 1e-9
+            if self.logging == 'every' and not (last or self.stopped) and (self.steps - 1) % self.log_every:
+                # The last step of a chunk is only logged when it is the last of the call
+                self.log.size -= 1
+            if not ahead:
+                checkpoint.save(self)
+    finally:
+        self.checkpoint = checkpoint
+
+
+def coasting(self):
+    # Engine off, either out of propellant or shut down for a coast
+    vehicle = self.vehicle
+    return (vehicle.mass.propellant <= vehicle.mass.residual_fuel or
+            vehicle.oxidizer_flow_rate + vehicle.fuel_flow_rate == 0) and self.velocity.tangential > 0
+
+
+def calc_numeric(self, calc_time):
+    # Flies with the rocket's integrator, without the closed form coast
+    self.kepler = False
+    try:
+        self.calc(calc_time)
+    finally:
+        self.kepler = True
+
+
+def calc_kepler(self, calc_time):
+    # Powered flight is integrated up to burnout. The coast is then flown in closed form
+    # wherever drag is negligible and numerically inside the atmosphere. Segments are
+    # logged and checked for events, a single jump when only the final state is kept.
+    end = self.time + calc_time
+    vehicle = self.vehicle
+    # A throttled engine burns longer than its full flow estimate, so this repeats
+    while not coasting(self) and not self.stopped:
+        burn = ((vehicle.mass.propellant - vehicle.mass.residual_fuel) /
+                (vehicle.oxidizer_flow_rate + vehicle.fuel_flow_rate))
+        start = self.time
+        calc_numeric(self, min(end - self.time, (math.ceil(burn / self.step) + 1) * self.step))
+        if self.time == start:
+            break
+    if not coasting(self):
+        return
+    log = loggers[self.logging]
+    self.last_step = -1
+    while end - self.time > 1e-9 and not self.stopped:
+        radius = self.position.altitude + Earth.radius
+        boundary = Earth.radius + vacuum_altitude(self)
+        segment = end - self.time
+        if radius > boundary:
+            orbit = kepler.Orbit(radius, self.velocity.radial, self.velocity.tangential)
+            if self.detectors or self.logging != 'final':
+                segment = min(segment, calc_time / kepler_segments, orbit.period / kepler_segments)
+            descent = orbit.crossing(boundary, rising=False)
+            if descent is not None:
+                segment = min(segment, descent)
+        if radius <= boundary or segment < 1e-6:
+            # Inside the atmosphere, a few steps at a time
+            if end - self.time < self.step:
+                break
+            calc_numeric(self, min(end - self.time, kepler_steps * self.step))
+            continue
+        start = self.time, get_state(self)
+        advance_kepler(self, segment)
+        self.time += segment
+        if end - self.time <= 1e-9:
+            self.last_step = self.steps
+        if self.detectors and detect_events(self, start, segment, advance_kepler):
+            return
+        log(self)
+        self.steps += 1
+
+
+def advance_kepler(self, step):
+    # Moves along the conic through the current state, forces are evaluated at the new state
+    radius, radial, tangential, anomaly, arc, area = kepler.propagate(
+        self.position.altitude + Earth.radius, self.velocity.radial, self.velocity.tangential, step)
+    self.position.altitude = radius - Earth.radius
+    # Ground track, the integral of the tangential velocity less the Earth's rotation
+    self.position.horizontal += arc - Earth.velocity_angular * area
+    self.position.theta += anomaly
+    self.velocity.radial, self.velocity.tangential = radial, tangential
+    self.velocity.total = (radial ** 2 + tangential ** 2) ** 0.5
+    update_air(self)
+    calc_forces(self)
+    calc_acceleration(self)
+    self.evaluations += 1
+
+
+def vacuum_altitude(self):
+    # Altitude above which drag acceleration stays below drag_tolerance, at the fastest
+    # speed the current orbit could reach at the surface
+    ceiling = self.atmosphere.drag_ceiling
+    table = self.atmosphere.table
+    vehicle = self.vehicle
+    area = vehicle.drag_coefficent * vehicle.frontal_area_sphere
+    if not area:
+        return min(ceiling, table.bottom)
+    radius = self.position.altitude + Earth.radius
+    speed_squared = self.velocity.total ** 2 + 2 * kepler.mu * (1 / Earth.radius - 1 / radius)
+    density = 2 * drag_tolerance * vehicle.mass.total / (area * speed_squared)
+    dense = np.flatnonzero(table.density > density)
+    if not dense.size:
+        return min(ceiling, table.bottom)
+    return min(ceiling, table.altitudes[min(dense[-1] + 1, len(table.altitudes) - 1)])
+
+
+def calc_euler_events(self, steps, log):
+    # Euler loop that checks the event detectors after every step
+    for step in range(steps):
+        start = self.time, get_state(self)
+        update_air(self)
+        update_mass(self)
+        calc_forces(self)
+        calc_acceleration(self)
+        calc_velocity(self)
+        calc_position(self)
+        if detect_events(self, start, self.step, advance_euler):
+            self.evaluations += step + 1
+            return
+        log(self)
+        self.time += self.step
+        self.steps += 1
+    self.evaluations += steps
+
+
+def advance_euler(self, step):
+    # One Euler step of a given length, used to locate events inside a step
+    full_step, self.step = self.step, step
+    update_air(self)
+    update_mass(self)
+    calc_forces(self)
+    calc_acceleration(self)
+    calc_velocity(self)
+    calc_position(self)
+    self.step = full_step
+
+
+def advance_runge_kutta(self, step):
+    # The last evaluation leaves the forces at the new state. The state is set again
+    # as update_air clamps altitudes below the surface.
+    state = get_state(self)
+    def f(time, state):
+        return derivatives(self, time, state)
+    rate = f(self.time, state)
+    if self.integrator == 'rk4':
+        state = integrators.rk4(f, self.time, state, step, rate)[0]
+    else:
+        state = integrators.dormand_prince(f, self.time, state, step, rate, self.rtol, self.atol)[0]
+    set_state(self, state)
+
+
+def detect_events(self, start, step, advance):
+    # Records events crossed during the step taken from start = (time, state), in time
+    # order. Returns True when a terminal event stopped the rocket at its location.
+    values = [detector.value(self) for detector in self.detectors]
+    previous, self.detector_values = self.detector_values, values
+    if previous is None:
+        return False
+    found = [locate_event(self, detector, start, step, advance, before, after)
+             for detector, before, after in zip(self.detectors, previous, values)
+             if detector.crossed(before, after)]
+    for probe, detector in sorted(found, key=lambda item: item[0].time):
+        self.evaluations += probe.evaluations
+        self.events.append({'name': detector.name, 'time': probe.time, 'row': log_row(probe)})
+        if detector.terminal:
+            # Continues from the event: its state is logged and the flight ends there
+            self.position, self.velocity = probe.position, probe.velocity
+            self.acceleration, self.vehicle, self.air = probe.acceleration, probe.vehicle, probe.air
+            self.g, self.thrust, self.drag = probe.g, probe.thrust, probe.drag
+            self.dynamic_pressure = probe.dynamic_pressure
+            self.time = probe.time
+            self.stopped = detector.name
+            self.last_step = self.steps
+            if self.logging == 'events':
+                calc_log_max_q(self)
+                self.log.append(log_row(self))
+                self.log_events.append(detector.name)
+            else:
+                loggers[self.logging](self)
+            self.steps += 1
+            return True
+    return False
+
+
+def locate_event(self, detector, start, step, advance, before, after):
+    # Illinois root finding on the time into the step. Each trial flies a copy of
+    # the rocket from the start of the step with the same integrator.
+    time, state = start
+    low, high = 0.0, step
+    side = evaluations = 0
+    crossed = None
+    for _ in range(100):
+        trial = (low * after - high * before) / (after - before)
+        probe = copy.copy(self)
+        probe.position, probe.velocity = copy.copy(self.position), copy.copy(self.velocity)
+        probe.acceleration, probe.air = copy.copy(self.acceleration), copy.copy(self.air)
+        probe.vehicle = copy.copy(self.vehicle)
+        probe.vehicle.mass = copy.copy(self.vehicle.mass)
+        probe.time, probe.evaluations = time, 0
+        set_state(probe, state)
+        advance(probe, trial)
+        probe.time = time + trial
+        evaluations += probe.evaluations or 1
+        value = detector.value(probe)
+        if detector.crossed(before, value):
+            crossed = probe
+            high, after = trial, value
+            if side == -1:
+                before /= 2
+            side = -1
+        else:
+            low, before = trial, value
+            if side == 1:
+                after /= 2
+            side = 1
+        if value == 0 or high - low < event_tolerance:
+            break
+    # The earliest trial found past the crossing, within the tolerance of the root
+    probe = crossed or probe
+    probe.evaluations = evaluations
+    return probe, detector
+
+
+def log_row(self):
+    return (self.time, self.position.altitude,
+            self.position.horizontal, self.velocity.radial,
+            self.velocity.tangential, self.velocity.total,
+            self.acceleration.radial, self.acceleration.tangential,
+            self.acceleration.total, self.acceleration.centripetal_acc,
+            self.vehicle.mass.total, self.thrust, self.drag,
+            self.position.theta)
 
 
 def calc_log(self):
-    self.log.append([self.time, self.position.altitude,
-                     self.position.horizontal, self.velocity.radial,
-                     self.velocity.tangential, self.velocity.total,
-                     self.acceleration.radial, self.acceleration.tangential,
-                     self.acceleration.total, self.acceleration.centripetal_acc,
-                     self.vehicle.mass.total, self.thrust, self.drag,
-                     self.position.theta])
-
-
-def graph(log):
-    log.loc[:, 'altitude'] = log.altitude.apply(lambda x: x / 1000)
-    log.loc[:, 'horizontal'] = log.horizontal.apply(lambda x: x / 1000)
-    log.loc[:, 'rad_acc'] = log.rad_acc.apply(lambda x: x / 9.805)
-    log.loc[:, 'tan_acc'] = log.tan_acc.apply(lambda x: x / 9.805)
-    log.loc[:, 'tot_acc'] = log.tot_acc.apply(lambda x: x / 9.805)
-    log.loc[:, 'cent_acc'] = log.cent_acc.apply(lambda x: x / 9.805)
+    self.log.append(log_row(self))
+
+
+def calc_log_every(self):
+    # Logs every Nth step and the last step of each calc call
+    if self.steps % self.log_every == 0 or self.steps == self.last_step:
+        self.log.append(log_row(self))
+
+
+def calc_log_final(self):
+    # Keeps a single row holding the latest state
+    self.log.size = 0
+    self.log.append(log_row(self))
+
+
+def calc_log_events(self):
+    # Logs burnout, crossing the drag cutoff (80 km), apogee and max-Q. Max-Q is the
+    # highest dynamic pressure so far, logged once one of the others makes it final,
+    # so local peaks such as the NASA model's 25 km kink are passed over.
+    row = log_row(self)
+    previous = self.previous_row
+    if self.dynamic_pressure > self.max_q:
+        if self.max_q_open:
+            # The row logged when the last calc call returned was not the peak after all
+            self.log.size -= 1
+            self.log_events.pop()
+            self.max_q_open = False
+        self.max_q = self.dynamic_pressure
+        self.max_q_row = row
+    if previous is not None:
+        ceiling = self.atmosphere.drag_ceiling
+        burnout = previous[11] > 0 and self.thrust == 0
+        cutoff = (previous[1] <= ceiling) != (self.position.altitude <= ceiling)
+        apogee = previous[3] > 0 and self.velocity.radial <= 0
+        if burnout or cutoff or apogee:
+            calc_log_max_q(self)
+        if burnout:
+            self.log.append(row)
+            self.log_events.append('burnout')
+        if cutoff:
+            self.log.append(row)
+            self.log_events.append('drag_cutoff')
+        if apogee:
+            self.log.append(previous)
+            self.log_events.append('apogee')
+    self.previous_row = row
+
+
+def calc_log_max_q(self, final=True):
+    # Logs the pending max-Q row. A row logged before the peak is final stays open,
+    # a higher dynamic pressure in a later calc call takes it back.
+    if self.max_q_row is not None:
+        self.log.append(self.max_q_row)
+        self.log_events.append('max_q')
+        self.max_q_row = None
+        self.max_q_open = not final
+    elif final:
+        self.max_q_open = False
+
+
+def graph(log, points=2000, path=None):
+    ''' Plots every column of a flight log against time. log is a DataFrame,
+    e.g. FlightLog.frame() or stream.frame(), or a FlightLog. Series longer than
+    points are decimated keeping each bucket's minimum and maximum, so peaks
+    survive. With a path the figure is saved there instead of shown, which
+    needs no display. '''
+    if not isinstance(log, pd.DataFrame):
+        log = log.frame()
+    time = log['time'].to_numpy()
     height, width = 2, 7
-    fig, ax = plt.subplots(height, width)
-    i, j = 0, 0
-    for col in log:
-        ax[i, j].scatter(log['time'], log[col])
-        ax[i, j].scatter(log['time'], log[col])
-        ax[i, j].set_title(col)
-        plt.xlabel('time [s]')
-        if j == (width - 1):
-            j = 0
-            i += 1
-        else:
-            j += 1
-    mng = plt.get_current_fig_manager()
-    mng.resize(*mng.window.maxsize())
+    fig, ax = plt.subplots(height, width, figsize=(28, 8) if path else None)
+    for n, col in enumerate(log):
+        # Units converted from m to km and from m/s2 to G's, the log itself is left as is
+        values = log[col].to_numpy() * graph_scales.get(col, 1)
+        keep = decimate(values, points)
+        axis = ax[n // width, n % width]
+        axis.plot(time[keep], values[keep], '.', markersize=2)
+        axis.set_title(col)
+        axis.set_xlabel('time [s]')
+    fig.tight_layout()
+    if path is not None:
+        fig.savefig(path)
+        plt.close(fig)
+        return
+    window = getattr(plt.get_current_fig_manager(), 'window', None)
+    if window is not None and hasattr(window, 'maxsize'):
+        plt.get_current_fig_manager().resize(*window.maxsize())
     plt.show()
 
 
+def decimate(values, points):
+    ''' Indices of about points samples of values, the minimum and maximum of
+    every bucket plus both ends, in order. '''
+    count = len(values)
+    if count <= points:
+        return np.arange(count)
+    buckets = max(points // 2, 1)
+    size = -(-count // buckets)
+    # The last bucket is padded with its own last value
+    padded = np.pad(values, (0, buckets * size - count), mode='edge').reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    keep = np.concatenate([[0, count - 1], offsets + np.argmin(padded, axis=1), offsets + np.argmax(padded, axis=1)])
+    return np.unique(np.minimum(keep, count - 1))
+
+
 Earth = planets.Earth()    # Planet reference information
+event_tolerance = 1e-6    # Seconds, width to which event times are located
+drag_tolerance = 1e-6    # m/s2, drag below this is neglected by the closed form coast
+kepler_segments = 64    # Logged segments per closed form coast, or per orbit if shorter
+kepler_steps = 64    # Steps flown at a time when a closed form coast enters the atmosphere
+
+# Unit conversions of rocket.graph, m to km and m/s2 to G's
+graph_scales = {'altitude': 1 / 1000, 'horizontal': 1 / 1000, 'rad_acc': 1 / 9.805, 'tan_acc': 1 / 9.805,
+                'tot_acc': 1 / 9.805, 'cent_acc': 1 / 9.805}
+
+# Logging policies
+loggers = {'full': calc_log, 'every': calc_log_every,
+           'final': calc_log_final, 'events': calc_log_events}
+
+# Flight log column names, in the order written by calc_log
+columns = ['time', 'altitude', 'horizontal', 'rad_vel',
+           'tan_vel', 'total_vel', 'rad_acc', 'tan_acc',
+           'tot_acc', 'cent_acc', 'mass', 'thrust',
+           'drag', 'theta']
 
 # Reference dictionaries
 oxidizer_density = {'H2O2_98%': 1430}    # kg/m3
@@ -317,4 +1098,3 @@ material = {'Al_6061_T6': [240e6, 2700]}   # { name: [yield strength (Pa), densi
 # Looking into the burn time. I believe the residual fuel shortens the burn time by a few seconds.
 # Improve model's direction of flight angle vs rocket's angle of attack. At this moment, they are the same. In reality, this is not the case
 # Need to improve rocket's mass prediction based on tank pressure
-# Conservation of energy is violated when gravity and centripetal are close to being equal...possible round-off error
@@ -0,0 +1,101 @@
+''' Vehicle sizing of a whole design grid at once. Every quantity of
+rocket.MultiStage, rocket.Vehicle and rocket.Mass is computed as a NumPy array
+with one row per design and one column per stage, so infeasible designs can be
+dropped before any trajectory is flown. Tank shells are sized from the tank
+pressure, giving a mass estimate the dry mass of each stage must cover. '''
+import numpy as np
+import atmosphere
+import nozzle
+import rocket
+import planets
+
+
+class Sizes(object):
+    ''' Sized stages of many designs, arrays of shape (designs, stages). '''
+
+    def __init__(self, stage_parms, setups):
+        column = lambda name: np.array([parms[name] for parms in stage_parms], dtype=float)
+        setting = lambda name: np.array([setup[name] for setup in setups], dtype=float)[:, np.newaxis]
+        text = lambda name: [setup.get(name) for setup in setups]
+        # rocket.Stage and rocket.MultiStage
+        self.stage_mass = column('mass_percentage') * np.array([p['rocket_mass'] for p in stage_parms],
+                                                                dtype=float)[:, np.newaxis]
+        self.wet_mass = column('propellant_mass_fraction') * self.stage_mass
+        self.dry_mass = self.stage_mass - self.wet_mass
+        self.burn_time = column('burn_time')
+        self.stack_mass = np.cumsum(self.stage_mass[:, ::-1], axis=1)[:, ::-1]
+        self.sub_mass_fraction = self.wet_mass / self.stack_mass
+        # rocket.Mass of each stage's vehicle, flown as the whole stack
+        mixture_ratio = setting('mixture_ratio')
+        self.dry = (1 - self.sub_mass_fraction) * self.stack_mass
+        self.propellant = self.stack_mass - self.dry
+        self.oxidizer = mixture_ratio * self.propellant / (mixture_ratio + 1)
+        self.fuel = self.propellant / (mixture_ratio + 1)
+        self.residual_fuel = self.stack_mass * self.sub_mass_fraction * setting('residual_fraction')
+        # rocket.Vehicle, spherical tanks
+        strength, density = (np.array([rocket.material[name][i] for name in text('tank_material')])[:, np.newaxis]
+                             for i in (0, 1))
+        self.oxidizer_volume = self.oxidizer / np.array([rocket.oxidizer_density[name]
+                                                         for name in text('oxidizer')])[:, np.newaxis]
+        self.fuel_volume = self.fuel / np.array([rocket.fuel_density[name] for name in text('fuel')])[:, np.newaxis]
+        self.oxidizer_sphere_radius = (3 * self.oxidizer_volume / (4 * np.pi)) ** (1.0 / 3.0)
+        self.fuel_sphere_radius = (3 * self.fuel_volume / (4 * np.pi)) ** (1.0 / 3.0)
+        self.frontal_area_sphere = np.pi * np.maximum(self.oxidizer_sphere_radius, self.fuel_sphere_radius) ** 2
+        # Thin walled pressure vessel, t = SF p r / (2 yield)
+        hoop = setting('safety_factor') * setting('tank_pressure') / (2 * strength)
+        self.oxidizer_wall_thickness = hoop * self.oxidizer_sphere_radius
+        self.fuel_wall_thickness = hoop * self.fuel_sphere_radius
+        shell = lambda radius, wall: 4 * np.pi / 3 * (radius ** 3 - (radius - wall) ** 3) * density
+        self.oxidizer_mass = shell(self.oxidizer_sphere_radius, self.oxidizer_wall_thickness)
+        self.fuel_mass = shell(self.fuel_sphere_radius, self.fuel_wall_thickness)
+        self.tank_mass = self.oxidizer_mass + self.fuel_mass
+        with np.errstate(divide='ignore'):
+            self.oxidizer_flow_rate = self.oxidizer / self.burn_time
+            self.fuel_flow_rate = self.fuel / self.burn_time
+        # Performance, nozzle engines use their launch pressure Isp on the first
+        # stage and their vacuum Isp on the stages above it
+        altitude = setting('altitude')
+        exhaust_velocity = np.repeat(setting('exhaust_velocity'), self.stage_mass.shape[1], axis=1)
+        for row, setup in enumerate(setups):
+            if setup['area_ratio'] is not None:
+                engine = nozzle.get(setup['exhaust_velocity'], setup['area_ratio'], setup['chamber_pressure'],
+                                    setup['gamma'])
+                exhaust_velocity[row] = engine.vacuum_velocity
+                exhaust_velocity[row, 0] = engine.velocity(atmosphere.get(setup['atmosphere']).conditions(
+                    setup['altitude'])[1])
+        self.exhaust_velocity = exhaust_velocity
+        self.thrust = (self.oxidizer_flow_rate + self.fuel_flow_rate) * exhaust_velocity
+        g = 9.805 * (Earth.radius / (Earth.radius + altitude)) ** 2
+        self.thrust_to_weight = self.thrust / (self.stack_mass * g)
+        # Ideal delta-v of the usable propellant, stages summed
+        self.stage_delta_v = exhaust_velocity * np.log(self.stack_mass /
+                                                       (self.stack_mass - self.propellant + self.residual_fuel))
+        self.delta_v = self.stage_delta_v.sum(axis=1)
+
+    def feasible(self, thrust_to_weight=1.0, delta_v=0.0, tank_mass=True):
+        ''' Boolean mask of designs worth flying and the reason each other one fails.
+        thrust_to_weight: least first stage thrust over weight at launch.
+        delta_v: least ideal delta-v of all stages together, m/s.
+        tank_mass: whether the pressurized tanks must fit within each stage's dry mass. '''
+        reasons = np.full(len(self.delta_v), None, dtype=object)
+        checks = [(self.thrust_to_weight[:, 0] < thrust_to_weight, 'thrust to weight'),
+                  ((self.oxidizer_wall_thickness >= self.oxidizer_sphere_radius).any(axis=1) |
+                   (self.fuel_wall_thickness >= self.fuel_sphere_radius).any(axis=1), 'tank wall'),
+                  (self.delta_v < delta_v, 'delta-v')]
+        if tank_mass:
+            checks.append(((self.tank_mass > self.dry_mass).any(axis=1), 'tank mass'))
+        for failed, reason in reversed(checks):
+            reasons[failed] = reason
+        return np.array([reason is None for reason in reasons], dtype=bool), reasons
+
+
+def size(points):
+    ''' Sizes (index, stage_parms, setup) points as yielded by sweep.points(). '''
+    setups = [dict(setup_defaults, **setup) for _, _, setup in points]
+    return Sizes([stage_parms for _, stage_parms, _ in points], setups)
+
+
+Earth = planets.Earth()    # Planet reference information
+setup_defaults = {'altitude': 0, 'exhaust_velocity': 3240, 'mixture_ratio': 0, 'safety_factor': 1,
+                  'tank_pressure': 0, 'residual_fraction': 0.02, 'atmosphere': 'nasa', 'area_ratio': None,
+                  'chamber_pressure': None, 'gamma': 1.2}    # rocket.Setup defaults
@@ -0,0 +1,98 @@
+''' Flight logs streamed to a memory-mappable .npy file while they are flown.
+Only the latest chunk of rows stays in memory. Pass a StreamLog as log= to
+rocket.build, Rocket or mission.Mission and read the file back with read() or
+frame(). The header is rewritten after every chunk, so the file is a valid
+array of the rows flushed so far even if the run dies. '''
+import ast
+import numpy as np
+import pandas as pd
+import rocket
+
+
+class StreamLog(rocket.FlightLog):
+    ''' FlightLog writing each chunk of rows to path once it fills up. '''
+
+    def __init__(self, path, chunk=65536):
+        rocket.FlightLog.__init__(self, capacity=0, chunk=chunk)
+        self.path = path
+        self.limit = chunk    # Rows kept in memory at most
+        self.flushed = 0    # Rows already on disk
+        self.file = open(path, 'w+b')
+        write_header(self.file, 0)
+
+    def __len__(self):
+        return self.flushed + self.size
+
+    def __getitem__(self, index):
+        # The latest rows are served from memory, anything older reads the file
+        if isinstance(index, int) and -self.size <= index < 0:
+            return self.data[self.size + index]
+        return self.rows()[index]
+
+    def reserve(self, rows):
+        # Flushes when the rows do not fit, memory never holds more than a chunk
+        if self.size + rows <= len(self.data):
+            return
+        self.flush()
+        rows = min(max(rows, len(self.data)), self.limit)
+        if rows > len(self.data):
+            self.data = np.empty((rows, len(rocket.columns)))
+
+    def extend(self, other):
+        rows = other.data[:len(other)] if isinstance(other, rocket.FlightLog) else other
+        for start in range(0, len(rows), self.limit):
+            part = rows[start:start + self.limit]
+            self.reserve(len(part))
+            self.data[self.size:self.size + len(part)] = part
+            self.size += len(part)
+
+    def flush(self):
+        ''' Appends the rows in memory to the file. '''
+        if self.size:
+            self.file.seek(0, 2)
+            np.ascontiguousarray(self.data[:self.size]).tofile(self.file)
+            self.flushed += self.size
+            self.size = 0
+            write_header(self.file, self.flushed)
+            self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def rows(self):
+        ''' Every row as one array, the flushed ones read from the file. '''
+        flushed = read(self.path) if self.flushed else np.empty((0, len(rocket.columns)))
+        return np.concatenate([flushed, self.data[:self.size]])
+
+    def column(self, name):
+        return self.rows()[:, rocket.columns.index(name)]
+
+    def frame(self):
+        return pd.DataFrame(self.rows(), columns=rocket.columns, copy=False)
+
+
+def write_header(file, rows):
+    # .npy version 1.0 header of a fixed size, so it can be rewritten in place
+    header = "{'descr': '<f8', 'fortran_order': False, 'shape': (%d, %d), }" % (rows, len(rocket.columns))
+    header = header.ljust(header_size - 10 - 1) + '\n'
+    file.seek(0)
+    file.write(b'\x93NUMPY\x01\x00' + len(header).to_bytes(2, 'little') + header.encode('latin1'))
+
+
+def read(path):
+    ''' Memory-maps a streamed log as a (rows, columns) array in rocket.columns order. '''
+    with open(path, 'rb') as file:
+        header = file.read(header_size)
+    shape = ast.literal_eval(header[10:].decode('latin1'))['shape']
+    if not shape[0]:
+        return np.empty(shape)
+    return np.memmap(path, dtype='<f8', mode='r', offset=header_size, shape=shape)
+
+
+def frame(path):
+    ''' A streamed log as a DataFrame with the columns rocket.graph expects. '''
+    return pd.DataFrame(read(path), columns=rocket.columns, copy=False)
+
+
+header_size = 128    # Bytes, a multiple of 64 as numpy writes them
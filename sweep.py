@@ -0,0 +1,181 @@
+import concurrent.futures
+import itertools
+import json
+import os
+import events
+import instrument
+import memo
+import mission
+import rocket
+import planets
+import sizing
+
+
+def points(stage_parms, setup, grid):
+    ''' Expands a grid into (index, stage_parms, setup) points in a fixed order.
+    grid maps stage_parms keys or Setup arguments to lists of values. '''
+    names = list(grid)
+    for index, values in enumerate(itertools.product(*(grid[name] for name in names))):
+        point_parms, point_setup = dict(stage_parms), dict(setup)
+        for name, value in zip(names, values):
+            if name in stage_parms:
+                point_parms[name] = value
+            else:
+                point_setup[name] = value
+        yield index, point_parms, point_setup
+
+
+def launch(stage_parms, setup, staging_delay=0, added_time=0, cache=None, stops=None, profile=None):
+    # Flies every stage of the rocket and returns the Mission
+    # stops: terminal events, by default a design that hits the ground stops there
+    stages = [rocket.Stage(i + 1, **stage_parms) for i in range(len(stage_parms['burn_time']))]
+    coast = [0] * (len(stages) - 1) + [added_time]
+    flight = mission.Mission(stages, rocket.Setup(**setup), staging_delay=staging_delay,
+                             coast=coast, logging='final', cache=cache, profile=profile,
+                             events=[events.ground()] if stops is None else stops)
+    flight.fly()
+    return flight
+
+
+def fly(stage_parms, setup, staging_delay=0, added_time=0, cache=None, stops=None):
+    # Final state of launch() as a dict
+    return launch(stage_parms, setup, staging_delay, added_time, cache, stops).final()
+
+
+def specific_energy(state):
+    # gh + 0.5v^2
+    return 9.805 * (Earth.radius + state['altitude']) + 0.5 * state['total_vel'] ** 2
+
+
+def evaluate(point, staging_delay=0, added_time=0, cache=None, profile=False):
+    ''' Flies one sweep point and returns a structured result with its wall time.
+    cache: True for a per-process stage cache, or a directory shared on disk.
+    profile: adds the point's instrument.Profile report to the result. '''
+    index, stage_parms, setup = point
+    result = {'index': index, 'stage_parms': stage_parms, 'setup': setup,
+              'score': None, 'final': None, 'stopped': None, 'error': None, 'seconds': None}
+    timings = instrument.Profile() if profile else None
+    started = instrument.clock()
+    try:
+        stages = memo.shared(None if cache is True else cache) if cache else None
+        flight = launch(stage_parms, setup, staging_delay, added_time, stages, profile=timings)
+        final = flight.final()
+        result['final'] = final
+        result['stopped'] = flight.stopped
+        result['score'] = specific_energy(final)
+    except Exception as error:
+        result['error'] = type(error).__name__
+    result['seconds'] = instrument.clock() - started
+    if profile:
+        result['profile'] = timings.report()
+    return result
+
+
+def evaluate_chunk(chunk, staging_delay, added_time, cache=None, profile=False):
+    return [evaluate(point, staging_delay, added_time, cache, profile) for point in chunk]
+
+
+def run(stage_parms, setup, grid, workers=None, chunksize=None, staging_delay=0, added_time=0, cache=None,
+        profile=False, journal=None, feasibility=None):
+    ''' Flies every grid point over a process pool. Results come back in grid
+    order and do not depend on the number of workers. Points sharing their
+    leading stages reuse them through the cache, see evaluate().
+    journal: path of a file each finished point is appended to. A rerun with
+    the same journal skips the points already in it.
+    feasibility: keyword arguments of sizing.Sizes.feasible, e.g. {'delta_v': 9000}.
+    Designs failing them are not flown, their result's error names the reason.
+    profile: True adds each point's timings to its result. An instrument.Profile
+    also collects them in its points and adds them up in its totals. '''
+    timings = profile if isinstance(profile, instrument.Profile) else None
+    profile = bool(profile)
+    work = list(points(stage_parms, setup, grid))
+    done = {}
+    if feasibility is not None:
+        feasible, reasons = sizing.size(work).feasible(**feasibility)
+        for point, reason in zip(work, reasons):
+            if reason is not None:
+                index, point_parms, point_setup = point
+                done[index] = {'index': index, 'stage_parms': point_parms, 'setup': point_setup, 'score': None,
+                               'final': None, 'stopped': None, 'error': 'infeasible: ' + reason, 'seconds': 0.0}
+        work = [point for point, keep in zip(work, feasible) if keep]
+    if journal is not None:
+        done.update(read_journal(journal, work, staging_delay, added_time))
+        work = [point for point in work if point[0] not in done]
+    workers = workers or os.cpu_count() or 1
+    results = list(done.values())
+    if workers == 1 or len(work) < 2:
+        for point in work:
+            results.extend(record(journal, evaluate_chunk([point], staging_delay, added_time, cache, profile),
+                                  staging_delay, added_time))
+        return collect(timings, sorted(results, key=lambda result: result['index']))
+    # A few chunks per worker balances load without paying pickling per point
+    chunksize = chunksize or max(1, -(-len(work) // (workers * 4)))
+    chunks = [work[i:i + chunksize] for i in range(0, len(work), chunksize)]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(evaluate_chunk, chunk, staging_delay, added_time, cache, profile)
+                   for chunk in chunks]
+        # Journaled as each chunk finishes, so a crash loses only the chunks in flight
+        for future in concurrent.futures.as_completed(futures):
+            results.extend(record(journal, future.result(), staging_delay, added_time))
+    return collect(timings, sorted(results, key=lambda result: result['index']))
+
+
+def collect(profile, results):
+    # Adds the timings of the flown points to a sweep's Profile, in grid order
+    if profile is not None:
+        for result in results:
+            report = result.get('profile')
+            if report is None:    # Infeasible or journaled before
+                continue
+            profile.points.append(dict(report, index=result['index'], wall=result['seconds']))
+            for name, phase in report['phases'].items():
+                profile.add(name, phase['seconds'], phase['calls'])
+            profile.steps += report['steps']
+            profile.evaluations += report['evaluations']
+            profile.elapsed += report['seconds']
+            profile.log_bytes = max(profile.log_bytes, report['log_bytes'])
+    return results
+
+
+def point_key(stage_parms, setup, staging_delay, added_time):
+    # Identifies a point in the journal, so a changed grid never reuses stale results
+    return memo.key(rocket.Setup(**setup), stage_parms=stage_parms, staging_delay=staging_delay,
+                    added_time=added_time)
+
+
+def record(journal, results, staging_delay, added_time):
+    # Appends finished points to the journal, one JSON line each
+    if journal is not None:
+        with open(journal, 'a') as output:
+            for result in results:
+                key = point_key(result['stage_parms'], result['setup'], staging_delay, added_time)
+                output.write(json.dumps(dict(result, key=key), default=memo.canonical) + '\n')
+            output.flush()
+            os.fsync(output.fileno())
+    return results
+
+
+def read_journal(journal, work, staging_delay, added_time):
+    ''' Results of the journaled points of work by index. A partly written last
+    line, left by a crash, is ignored. '''
+    keys = {index: point_key(stage_parms, setup, staging_delay, added_time) for index, stage_parms, setup in work}
+    done = {}
+    if not os.path.exists(journal):
+        return done
+    with open(journal) as handle:
+        lines = handle.read().split('\n')
+    for line in lines:
+        try:
+            result = json.loads(line)
+        except ValueError:
+            continue
+        if keys.get(result.get('index')) == result.pop('key', None):
+            done[result['index']] = result
+    if lines[-1]:
+        # Ends the torn line so the next point starts a line of its own
+        with open(journal, 'a') as output:
+            output.write('\n')
+    return done
+
+
+Earth = planets.Earth()    # Planet reference information
@@ -0,0 +1,216 @@
+''' Performance baseline of the trajectory engine. Flies a fixed set of scenarios,
+measures steps per second, peak memory and accuracy, and compares them with
+baselines.json. Any regression is printed and the script exits with status 1.
+
+    python test/benchmark/benchmark.py              # Check against the baselines
+    python test/benchmark/benchmark.py --update     # Store new baselines
+    python test/benchmark/benchmark.py sweep        # Only some scenarios
+'''
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+import batch
+import gravity
+import kepler
+import mission
+import planets
+import rocket
+
+Earth = planets.Earth()    # Planet reference information
+
+baselines_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+speed_tolerance = 0.3    # Steps per second may fall this fraction below the baseline
+memory_tolerance = 0.5    # Peak memory may grow this fraction above the baseline
+result_tolerance = 1e-6    # Relative change allowed in any result
+
+
+def single_stage():
+    # One stage burn as in model_validation_1/model_test_1.py. The same burn from rest
+    # without gravity or drag is compared with the rocket equation.
+    options = dict(altitude=22000, mass=31, mass_fraction=0.80, mixture_ratio=7.4, burn_time=90,
+                   tank_material='Al_6061_T6', fuel='RP-1', oxidizer='H2O2_98%', safety_factor=1.2,
+                   tank_pressure=7e6)
+    flight = rocket.build(rocket.Setup(drag_coefficent=0.30, **options))
+    flight.calc(150)
+    vacuum = rocket.build(rocket.Setup(drag_coefficent=0, gravity=gravity.PointMass(mu=0),
+                                       velocity_tangential=-Earth.velocity_angular * (Earth.radius + 22000),
+                                       **options), logging='final')
+    initial_mass, initial_velocity = vacuum.vehicle.mass.total, vacuum.velocity.total
+    vacuum.calc(150)
+    ideal = vacuum.engine.exhaust_velocity * math.log(initial_mass / vacuum.vehicle.mass.total)
+    delta_v = vacuum.velocity.total - initial_velocity
+    return flight.steps + vacuum.steps, {'delta_v': delta_v, 'delta_v_error': abs(delta_v - ideal) / ideal,
+                                         'altitude': flight.log[-1][1]}
+
+
+def three_stage():
+    # The three stage Mission of staging.py
+    stage_parms = {'rocket_mass': 1000,
+                   'propellant_mass_fraction': [0.80] * 3,
+                   'mass_percentage': [0.75, 0.20, 0.05],
+                   'burn_time': [100, 160, 320],
+                   'angle': [45, 80, 90]}
+    stages = [rocket.Stage(i, **stage_parms) for i in (1, 2, 3)]
+    setup = rocket.Setup(altitude=22000, mixture_ratio=7.4, tank_material='Al_6061_T6', fuel='RP-1',
+                         oxidizer='H2O2_98%', safety_factor=1.2, tank_pressure=7e6, drag_coefficent=0.30)
+    flight = mission.Mission(stages, setup)
+    flight.fly()
+    final = flight.final()
+    return len(flight.log), {'altitude': final['altitude'], 'total_vel': final['total_vel'],
+                             'score': specific_energy(final['altitude'], final['total_vel'])}
+
+
+def sweep():
+    # The 15 x 15 batch sweep of model.py, steps are counted per vehicle
+    points = []
+    for a in range(70, 85):
+        for b in range(25, 10, -1):
+            stage_parms = {'rocket_mass': 1000,
+                           'propellant_mass_fraction': [0.80, 0.80, 0.80],
+                           'mass_percentage': [a / 100, b / 100, 0.05],
+                           'burn_time': [60, 80, 350],
+                           'angle': [50, 70, 70]}
+            stages = [rocket.Stage(i, **stage_parms) for i in (1, 2, 3)]
+            points.append((stages, rocket.MultiStage(*stages)))
+    setup = rocket.Setup(altitude=22000, mass=100, mass_fraction=0.80, mixture_ratio=5, burn_time=60,
+                         tank_material='Al_6061_T6', fuel='RP-1', oxidizer='H2O2_98%', safety_factor=2,
+                         tank_pressure=0, drag_coefficent=0.32, angle=0)
+    flight, steps = None, 0
+    for stage in (1, 2, 3):
+        following = batch.build([rocket.stage_setup(setup, multi_stage, stages[stage - 1])
+                                 for stages, multi_stage in points])
+        if flight is not None:
+            batch.hand_off(flight, following)
+        flight = following
+        burn_time = points[0][0][stage - 1].burn_time
+        flight.calc(burn_time)
+        steps += flight.size * int(burn_time / flight.step)
+    final = flight.final()
+    final = final[final['active']]
+    scores = specific_energy(final['altitude'].values, final['total_vel'].values)
+    return steps, {'best_score': scores.max(), 'surviving': len(final)}
+
+
+def earth_escape():
+    # Short burn above the atmosphere onto an escape trajectory, then a long coast.
+    # The orbital energy should not change once the engine is off.
+    setup = rocket.Setup(altitude=200000, velocity_radial=10000, velocity_tangential=2000, angle=90,
+                         mass=100, mass_fraction=0.8, mixture_ratio=7.4, burn_time=60,
+                         tank_material='Al_6061_T6', fuel='RP-1', oxidizer='H2O2_98%', safety_factor=1.2,
+                         tank_pressure=7e6, drag_coefficent=0.30)
+    flight = rocket.build(setup)
+    flight.calc(5000)
+    burnout = int(60 / flight.step) + 1
+    energy = orbital_energy(flight.log[burnout]), orbital_energy(flight.log[-1])
+    coast = rocket.build(setup, logging='final', kepler=True)
+    coast.calc(5000)
+    return flight.steps, {'altitude': flight.log[-1][1], 'energy': energy[1],
+                          'energy_drift': abs(energy[1] - energy[0]) / abs(energy[0]),
+                          'kepler_altitude': coast.log[-1][1]}
+
+
+def specific_energy(altitude, total_vel):
+    # gh + 0.5v^2, the score of staging.py and model.py, MJ/kg
+    return (9.805 * (Earth.radius + altitude) + 0.5 * total_vel ** 2) / 1e6
+
+
+def orbital_energy(row):
+    # 0.5v^2 - mu/r with the inertial velocity of a log row, J/kg
+    return 0.5 * (row[3] ** 2 + row[4] ** 2) - kepler.mu / (Earth.radius + row[1])
+
+
+scenarios = {'single_stage': single_stage,
+             'three_stage': three_stage,
+             'sweep': sweep,
+             'earth_escape': earth_escape}
+
+
+def measure(scenario, repeat):
+    ''' Best wall time of repeat runs after an untimed warm-up, and the peak
+    traced memory of one more. '''
+    # The warm-up pays one-off costs such as building the atmosphere tables
+    scenario()
+    seconds = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        steps, results = scenario()
+        seconds = min(seconds, time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        scenario()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'steps': steps, 'seconds': seconds, 'steps_per_second': steps / seconds,
+            'peak_bytes': peak, 'results': {name: float(value) for name, value in results.items()}}
+
+
+def compare(name, measured, baseline, tolerance=speed_tolerance):
+    ''' Regressions of a scenario against its baseline, as messages. '''
+    failures = []
+    floor = baseline['steps_per_second'] * (1 - tolerance)
+    if measured['steps_per_second'] < floor:
+        failures.append('%s: %.0f steps/s, baseline %.0f' % (name, measured['steps_per_second'],
+                                                            baseline['steps_per_second']))
+    if measured['peak_bytes'] > baseline['peak_bytes'] * (1 + memory_tolerance):
+        failures.append('%s: peak memory %d bytes, baseline %d' % (name, measured['peak_bytes'],
+                                                                  baseline['peak_bytes']))
+    if measured['steps'] != baseline['steps']:
+        failures.append('%s: %d steps, baseline %d' % (name, measured['steps'], baseline['steps']))
+    for result, expected in baseline['results'].items():
+        value = measured['results'].get(result)
+        if value is None or not math.isclose(value, expected, rel_tol=result_tolerance, abs_tol=1e-12):
+            failures.append('%s: %s = %r, baseline %r' % (name, result, value, expected))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Trajectory engine benchmarks')
+    parser.add_argument('scenarios', nargs='*', help='Scenarios to run, all by default: ' + ', '.join(scenarios))
+    parser.add_argument('--update', action='store_true', help='Store the measurements as the new baselines')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per scenario, the best is kept')
+    parser.add_argument('--tolerance', type=float, default=speed_tolerance,
+                        help='Fraction steps per second may fall below the baseline')
+    parser.add_argument('--baselines', default=baselines_path)
+    args = parser.parse_args(argv)
+    for name in args.scenarios:
+        if name not in scenarios:
+            parser.error('Unknown scenario: ' + name)
+    baselines = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines) as file:
+            baselines = json.load(file)
+    failures = []
+    for name in args.scenarios or list(scenarios):
+        measured = measure(scenarios[name], args.repeat)
+        print('%-14s %10d steps %8.3f s %12.0f steps/s %8.1f MB peak' % (
+            name, measured['steps'], measured['seconds'], measured['steps_per_second'],
+            measured['peak_bytes'] / 1e6))
+        for result, value in measured['results'].items():
+            print('    %-16s %r' % (result, value))
+        if args.update:
+            baselines[name] = measured
+        elif name in baselines:
+            failures += compare(name, measured, baselines[name], args.tolerance)
+        else:
+            failures.append(name + ': no baseline, run with --update')
+    if args.update:
+        with open(args.baselines, 'w') as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+            file.write('\n')
+        print('Baselines written to ' + args.baselines)
+        return 0
+    for failure in failures:
+        print('REGRESSION ' + failure)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
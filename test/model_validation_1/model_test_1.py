@@ -1,17 +1,28 @@
 import matplotlib.pyplot as plt
 import numpy as np
-import math, rocket, planets
+import math, gravity, rocket, planets
 
-fire = rocket.Rocket(31, 90, time_step=0.0625, altitude=22000, propellant_mass_fraction=0.80, mixture_ratio=7.4, tank_pressure=7e6, tank_safety_factor=1.2)    # Initialize your rocket with design parameters and starting conditions
+Earth = planets.Earth()    # Planet reference information
+
+# Initialize your rocket with design parameters and starting conditions. Gravity and drag are
+# switched off and the rocket starts at rest in space, so it flies a straight line under thrust
+# alone as in the rocket equation.
+setup = rocket.Setup(altitude=22000, mass=31, mass_fraction=0.80, mixture_ratio=7.4, burn_time=90,
+                     tank_material='Al_6061_T6', fuel='RP-1', oxidizer='H2O2_98%', safety_factor=1.2,
+                     tank_pressure=7e6, drag_coefficent=0,
+                     velocity_tangential=-Earth.velocity_angular * (Earth.radius + 22000),
+                     gravity=gravity.PointMass(mu=0))
+fire = rocket.build(setup)
 initial_mass = fire.vehicle.mass.total
+initial_velocity = fire.velocity.total
 fire.calc(150)    # Method's parameter is the length of simulation in seconds
 final_mass = fire.vehicle.mass.total
 exhaust_velocity = fire.engine.exhaust_velocity
 
 Theorectical_Delta_V = exhaust_velocity * math.log(initial_mass / final_mass)
-Model_Delta_V = fire.log[-1][2]
+Model_Delta_V = fire.velocity.total - initial_velocity
 
 print('Theorectical Delta-V: ' + str(Theorectical_Delta_V) + ' m/s')
 print('Model Delta-V: ' + str(Model_Delta_V) + ' m/s')
 relative_error = (math.fabs(Theorectical_Delta_V - Model_Delta_V) / Theorectical_Delta_V) * 100
-print('Relative Error: ' + str(round(relative_error, 4)) + '%')
\ No newline at end of file
+print('Relative Error: ' + str(round(relative_error, 4)) + '%')
@@ -0,0 +1,58 @@
+''' Flat state kernel of kernel.py against Rocket.calc. Run with python -m pytest test/unit '''
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+import kernel
+import rocket
+
+
+def single_stage():
+    # The one stage burn of model_validation_1
+    return rocket.Setup(altitude=22000, mass=31, mass_fraction=0.80, mixture_ratio=7.4, burn_time=90,
+                        tank_material='Al_6061_T6', fuel='RP-1', oxidizer='H2O2_98%', safety_factor=1.2,
+                        tank_pressure=7e6, drag_coefficent=0.30)
+
+
+def fly(calc_time, **options):
+    flight = rocket.build(single_stage(), **options)
+    flight.calc(calc_time)
+    return flight
+
+
+def best_time(calc_time, repeat, **options):
+    seconds = []
+    for _ in range(repeat):
+        flight = rocket.build(single_stage(), **options)
+        started = time.perf_counter()
+        flight.calc(calc_time)
+        seconds.append(time.perf_counter() - started)
+    return min(seconds)
+
+
+@pytest.mark.parametrize('options', [{}, {'logging': 'every', 'log_every': 10}, {'logging': 'final'}])
+def test_kernel_matches_calc(options):
+    reference, flight = fly(400, **options), fly(400, kernel=True, **options)
+    assert kernel.supports(flight)
+    assert np.array_equal(flight.log[:], reference.log[:])
+    assert flight.steps == reference.steps and flight.evaluations == reference.evaluations
+
+
+@pytest.mark.skipif(kernel.available, reason='the plain Python loop only runs without Numba')
+def test_plain_python_kernel_is_faster():
+    # About 2x, see kernel.py
+    assert best_time(400, 5, kernel=True) < best_time(400, 5)
+
+
+def test_compiled_kernel():
+    pytest.importorskip('numba')
+    assert kernel.available and kernel.advance is not kernel.run
+    fly(1, kernel=True)    # Compiles the loop
+    reference, flight = fly(400), fly(400, kernel=True)
+    assert np.array_equal(flight.log[:], reference.log[:])
+    assert best_time(400, 5, kernel=True) * 50 < best_time(400, 5)
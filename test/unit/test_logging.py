@@ -0,0 +1,62 @@
+''' Logging policies of rocket.Rocket. Run with python -m pytest test/unit '''
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+import rocket
+
+
+def single_stage():
+    # The one stage burn of model_validation_1, launched from the ground so it
+    # flies through the kink of the NASA model at 25 km
+    return rocket.Setup(altitude=0, mass=31, mass_fraction=0.80, mixture_ratio=7.4, burn_time=90,
+                        tank_material='Al_6061_T6', fuel='RP-1', oxidizer='H2O2_98%', safety_factor=1.2,
+                        tank_pressure=7e6, drag_coefficent=0.30)
+
+
+def peak_time(setup, calc_time):
+    # Time of the highest dynamic pressure, flown a step at a time
+    flight = rocket.build(setup)
+    highest = peak = 0
+    for _ in range(int(calc_time / flight.step)):
+        time = flight.time
+        flight.calc(flight.step)
+        if flight.dynamic_pressure > highest:
+            highest, peak = flight.dynamic_pressure, time
+    return peak
+
+
+def test_events_log_one_max_q():
+    flight = rocket.build(single_stage(), logging='events')
+    flight.calc(150)
+    assert flight.log_events.count('max_q') == 1
+    assert flight.log_events == ['max_q', 'burnout', 'drag_cutoff']
+    assert flight.log[flight.log_events.index('max_q')][0] == peak_time(single_stage(), 150)
+
+
+def test_events_log_one_max_q_over_calc_calls():
+    # A max-Q logged when a call returns is taken back when the next call passes it
+    flight = rocket.build(single_stage(), logging='events')
+    for _ in range(15):
+        flight.calc(10)
+    assert flight.log_events == ['max_q', 'burnout', 'drag_cutoff']
+    times = [row[0] for row in flight.log[:]]
+    assert times == sorted(times)
+
+
+def test_events_log_max_q_of_unfinished_flight():
+    # Still in the atmosphere and burning, the highest dynamic pressure so far is logged
+    flight = rocket.build(single_stage(), logging='events')
+    flight.calc(30)
+    assert flight.log_events == ['max_q']
+
+
+def test_log_holds_only_its_rows():
+    # The first reservation is sized from the flight, not a fixed chunk
+    full = rocket.build(single_stage())
+    full.calc(150)
+    assert len(full.log.data) == len(full.log) == 2400
+    every = rocket.build(single_stage(), logging='every', log_every=10)
+    every.calc(150)
+    assert len(every.log.data) == len(every.log) == 241
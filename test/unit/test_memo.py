@@ -0,0 +1,60 @@
+''' Stage cache keys of memo.py. Run with python -m pytest test/unit '''
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+import events
+import memo
+import rocket
+
+
+def single_stage():
+    # The one stage burn of model_validation_1
+    return rocket.Setup(altitude=22000, mass=31, mass_fraction=0.80, mixture_ratio=7.4, burn_time=90,
+                        tank_material='Al_6061_T6', fuel='RP-1', oxidizer='H2O2_98%', safety_factor=1.2,
+                        tank_pressure=7e6, drag_coefficent=0.30)
+
+
+def stop_time(cache, event):
+    # Time a cached flight stops at the terminal event
+    setup = single_stage()
+    flight = memo.calc(rocket.build(setup, logging='final', events=[event]), setup, 150, cache)
+    return flight.stopped, flight.time
+
+
+def above(target):
+    return lambda r: r.position.altitude > target
+
+
+class Above(object):
+    def __init__(self, target):
+        self.target = target
+
+    def reached(self, r):
+        return r.position.altitude > self.target
+
+
+def test_altitude_events_keyed_by_target():
+    cache = memo.Cache()
+    low, high = (stop_time(cache, events.altitude(target, terminal=True)) for target in (50000, 90000))
+    assert low[1] < high[1] and cache.hits == 0
+
+
+def test_predicates_keyed_by_function():
+    cache = memo.Cache()
+    first = stop_time(cache, events.predicate('x', lambda r: r.position.altitude > 50000, terminal=True))
+    second = stop_time(cache, events.predicate('x', lambda r: r.velocity.total > 2000, terminal=True))
+    low, high = (stop_time(cache, events.predicate('x', above(target), terminal=True)) for target in (50000, 90000))
+    assert first != second and low[1] < high[1] and cache.hits == 0
+    # The same condition again is served from the cache
+    assert stop_time(cache, events.predicate('x', above(90000), terminal=True)) == high
+    assert cache.hits == 1
+
+
+def test_bound_method_predicates_not_cached():
+    cache = memo.Cache()
+    low, high = (stop_time(cache, events.predicate('x', Above(target).reached, terminal=True))
+                 for target in (50000, 90000))
+    assert low[1] < high[1]
+    assert cache.hits == cache.misses == 0 and not cache.memory
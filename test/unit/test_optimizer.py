@@ -0,0 +1,38 @@
+''' Simulations the optimizers of optimizer.py need against the brute-force grid
+of model.py. Run with python -m pytest test/unit '''
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+import optimizer
+import sweep
+
+# The three stage rocket of model.py
+stage_parms = {'rocket_mass': 1000, 'propellant_mass_fraction': [0.80, 0.80, 0.80],
+               'mass_percentage': [0.75, 0.20, 0.05], 'burn_time': [60, 80, 350], 'angle': [50, 70, 70]}
+setup = dict(altitude=22000, mass=100, mass_fraction=0.80, mixture_ratio=5, burn_time=60,
+             tank_material='Al_6061_T6', fuel='RP-1', oxidizer='H2O2_98%', safety_factor=2, tank_pressure=0,
+             drag_coefficent=0.32, angle=0)
+# Its 15 x 15 grid over the first and second stage mass split
+grid = {'mass_percentage': [[a / 100, b / 100, 0.05] for a in range(70, 85) for b in range(25, 10, -1)]}
+variables = [('mass_percentage', 1, 0.70, 0.84), ('mass_percentage', 2, 0.11, 0.25)]
+
+
+@pytest.fixture(scope='module')
+def grid_best():
+    results = sweep.run(stage_parms, setup, grid, workers=1)
+    return len(results), max(result['score'] for result in results if result['score'] is not None)
+
+
+@pytest.mark.parametrize('method', [optimizer.nelder_mead,
+                                    lambda design: optimizer.gradient_ascent(design, workers=1),
+                                    optimizer.bayesian],
+                         ids=['nelder_mead', 'gradient_ascent', 'bayesian'])
+def test_reaches_grid_best_with_tenth_of_simulations(grid_best, method):
+    simulations, best = grid_best
+    result = method(optimizer.Design(stage_parms, setup, variables))
+    assert result['score'] >= best * (1 - 1e-9)
+    assert result['simulations'] * 10 <= simulations